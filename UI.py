@@ -1,4 +1,133 @@
-import pygame
+import pygame, collections, math, instrumentation
+
+fontPath = '_Roboto-Bold.ttf'
+fontCache = {}
+
+def get_font(path, size):
+    font = fontCache.get((path, size))
+    if font is None:
+        instrumentation.instruments.count('font loads')
+        font = pygame.font.Font(path, size)
+        fontCache[(path, size)] = font
+    return font
+
+class Surface_Cache:
+
+    # LRU cache of rendered text surfaces; surfaces are shared, so callers must not draw onto them
+
+    def __init__(self, maxSize=2048):
+        self.maxSize = maxSize
+        self.surfaces = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, size, colour, path=fontPath):
+        key = (path, text, size, colour)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        instrumentation.instruments.count('text renders')
+        surface = get_font(path, size).render(text, True, colour)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha() #display pixel format, blits without a per pixel conversion
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.maxSize:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+textCache = Surface_Cache()
+
+class Dirty_Regions:
+
+    # Screen areas changed since the last frame, collected by widgets as they change
+
+    def __init__(self):
+        self.rects = []
+        self.full = True
+
+    def add(self, rect):
+        if not self.full:
+            self.rects.append(pygame.Rect(rect))
+
+    def add_all(self):
+        self.full = True
+        self.rects = []
+
+    def pending(self):
+        return self.full or len(self.rects) > 0
+
+    def collect(self):
+        full, rects = self.full, self.rects
+        self.full = False
+        self.rects = []
+        return full, rects
+
+dirtyRegions = Dirty_Regions()
+
+class Camera:
+
+    # Maps world positions, which nodes, hit-testing and the spatial indexes
+    # use, to screen positions: screen = (world - offset) * zoom. Widgets draw
+    # and report dirty bounds through the shared instance below.
+
+    minZoom = 0.05
+    maxZoom = 4
+    detailZoom = 0.75 #labels and overlay rings are skipped below this zoom
+
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+        self.zoom = 1
+
+    def to_screen(self, pos):
+        return ((pos[0] - self.x) * self.zoom, (pos[1] - self.y) * self.zoom)
+
+    def to_world(self, pos):
+        return (pos[0] / self.zoom + self.x, pos[1] / self.zoom + self.y)
+
+    def world_rect(self, rect):
+        x, y = self.to_world(rect[:2])
+        return (x, y, rect[2] / self.zoom, rect[3] / self.zoom)
+
+    def scale_width(self, width):
+        return max(1, int(width * self.zoom + 0.5))
+
+    def show_detail(self):
+        return self.zoom >= self.detailZoom
+
+    def pan(self, dx, dy):
+        #by a screen distance
+        self.x -= dx / self.zoom
+        self.y -= dy / self.zoom
+        dirtyRegions.add_all()
+
+    def zoom_at(self, screenPos, factor):
+        #keeps the world point under screenPos in place
+        x, y = self.to_world(screenPos)
+        self.zoom = min(self.maxZoom, max(self.minZoom, self.zoom * factor))
+        self.x = x - screenPos[0] / self.zoom
+        self.y = y - screenPos[1] / self.zoom
+        dirtyRegions.add_all()
+
+    def fit(self, worldRect, view):
+        #shows worldRect inside the screen rect view, never zooming in past 1
+        self.zoom = min(1, max(self.minZoom, min(view[2] / worldRect[2], view[3] / worldRect[3])))
+        self.x = worldRect[0] + worldRect[2] / 2 - (view[0] + view[2] / 2) / self.zoom
+        self.y = worldRect[1] + worldRect[3] / 2 - (view[1] + view[3] / 2) / self.zoom
+        dirtyRegions.add_all()
+
+    def reset(self):
+        self.x = self.y = 0
+        self.zoom = 1
+        dirtyRegions.add_all()
+
+camera = Camera()
 
 class Box:
 
@@ -16,6 +145,9 @@ class Box:
     def pos_is_in(self, point):
         return self.rect.collidepoint(point[0], point[1])
 
+    def get_bounds(self):
+        return self.rect
+
     def display(self, screen):
         pygame.draw.rect(screen, self.colour, self.rect, self.outlineThickness, self.rounding)
 
@@ -50,9 +182,7 @@ class Text:
         self.fit_text()
 
     def get_text(self):
-        font = pygame.font.Font('_Roboto-Bold.ttf', self.fontSize)
-        textObj = font.render(self.text, True, self.textColour)
-        return textObj
+        return textCache.render(self.text, self.fontSize, self.textColour)
 
     def get_rect(self):
         textRect = self.textObj.get_rect()
@@ -80,14 +210,20 @@ class Text:
             self.rect = self.get_rect()
 
     def set_text(self, text):
+        if text == self.text:
+            return
+        dirtyRegions.add(self.rect)
         self.text = text
         self.textObj = self.get_text()
         self.rect = self.get_rect()
-        self.fit_text() 
+        self.fit_text()
+        dirtyRegions.add(self.rect)
 
     def set_pos(self, x, y):
-        self.pos = pygame.math.Vector2(x, y)
-        self.textObj = self.get_text()
+        #moving only shifts the blit rect, the rendered surface stays the same
+        if x == self.pos.x and y == self.pos.y:
+            return
+        self.pos.update(x, y)
         self.rect = self.get_rect()
 
     def display(self, screen):
@@ -107,6 +243,8 @@ class Button(Box):
         return self.rect.collidepoint(mousePos)
     
     def set_enabled(self, enabled):
+        if enabled != self.enabled:
+            dirtyRegions.add(self.rect)
         self.enabled = enabled
 
     def display(self, screen):
@@ -146,11 +284,14 @@ class TextBox(Box):
         return int(self.text)
 
     def set_enabled(self, enabled, targetEdge=None):
+        if enabled == self.enabled and targetEdge is self.targetEdge:
+            return
+        dirtyRegions.add(self.rect)
         self.enabled = enabled
         self.targetEdge = targetEdge
         if targetEdge is None:
             return
-        self.set_text(targetEdge.lengthText.text)
+        self.set_text(targetEdge.length)
         
 
     def set_text(self, text):
@@ -167,134 +308,384 @@ class TextBox(Box):
 ###
 
 
+def line_bounds(p1, p2, thickness):
+    rect = pygame.Rect(min(p1[0], p2[0]), min(p1[1], p2[1]), abs(p2[0] - p1[0]) + 1, abs(p2[1] - p1[1]) + 1)
+    return rect.inflate(2 * thickness, 2 * thickness)
+
+
 class Node:
 
+    # Scenes can hold tens of thousands of nodes, so a node only keeps its own
+    # state in slots: no __dict__, no per node Circle or Text objects. Bodies,
+    # rings and bodies with their label drawn in are rendered once per zoom
+    # into shared colour keyed sprites, and the editor draws every node with
+    # one Surface.blits call.
+
+    __slots__ = ('id', 'displayNum', 'pos', 'lastValidPos', 'valid', 'editing', 'edges', 'overlay', 'overlayDistance', 'label')
+
     size = 30
     colour = (44, 74, 178, 255)
     invalidColour = (210, 77, 77, 100)
     selectedColour = (232, 255, 106)
     textColour = (200, 200, 200)
     fontSize = 30
-    count = 0
-
-    def __init__(self, x, y, id):
-        Node.count += 1
+    overlayColours = {'frontier' : (255, 170, 60), 'settled' : (120, 220, 120)}
+    overlayTextColour = (30, 30, 30)
+    labels = {} #label text -> surface shrunk to fit the node
+    spriteKey = (255, 0, 255)
+    spriteZoom = None
+    spriteRadius = size
+    bodies = {} #valid -> plain body at spriteZoom
+    rings = {} #(editing, overlay) -> selection and overlay rings at spriteZoom
+    labelled = collections.OrderedDict() #(label, radius) -> [valid body with its label, frame last drawn], least recently used first
+    labelledBytes = 0
+    maxLabelledBytes = 16 << 20 #nodes never overlap, so a screenful of labelled bodies is about 4MB at any zoom
+    frame = 0
+
+    def __init__(self, x, y, id, displayNum):
+        self.id = id
+        self.displayNum = displayNum
+        self.pos = pygame.Vector2(x, y)
+        self.lastValidPos = (x, y)
         self.valid = True
         self.editing = False
-        self.displayNum = Node.count
-        self.id = id
-        self.circle = Circle(x, y, self.size, self.colour)
-        self.lastValidPos = pygame.Vector2(x, y)
-        self.highlight = Circle(x, y, self.size * 1.1, self.selectedColour, self.size, False)
-        self.text = Text(x, y, str(self.displayNum), self.textColour, self.fontSize, anchor='c', maxWidth=self.size*1.7)
-        
-
-    def __del__(self):
-        Node.count -= 1
+        self.edges = set()
+        self.overlay = None
+        self.overlayDistance = None
+        self.label = self.get_label(str(displayNum))
+
+    @classmethod
+    def get_label(cls, text):
+        label = cls.labels.get(text)
+        if label is None:
+            fontSize = cls.fontSize
+            while get_font(fontPath, fontSize).size(text)[0] >= cls.size * 1.7: #measured rather than rendered at every size
+                fontSize -= 1
+            label = cls.labels[text] = textCache.render(text, fontSize, cls.textColour)
+        return label
+
+    @classmethod
+    def next_frame(cls):
+        cls.frame += 1
+
+    @classmethod
+    def set_spriteZoom(cls, zoom):
+        #plain bodies and rings only exist at the current zoom, labelled bodies are kept by radius
+        cls.spriteZoom = zoom
+        cls.spriteRadius = max(1, int(cls.size * zoom + 0.5))
+        cls.bodies = {}
+        cls.rings = {}
+
+    @classmethod
+    def new_sprite(cls, half):
+        sprite = pygame.Surface((2 * half + 1, 2 * half + 1))
+        sprite.fill(cls.spriteKey)
+        return sprite
+
+    @classmethod
+    def finish_sprite(cls, sprite):
+        #colour keyed and run length encoded: blits like a solid fill, per pixel alpha would not
+        if pygame.display.get_surface() is not None:
+            sprite = sprite.convert()
+        sprite.set_colorkey(cls.spriteKey, pygame.RLEACCEL)
+        return sprite
+
+    @classmethod
+    def get_body(cls, valid):
+        sprite = cls.bodies.get(valid)
+        if sprite is None:
+            radius = cls.spriteRadius
+            colour = cls.colour if valid else cls.invalidColour
+            sprite = cls.new_sprite(radius)
+            pygame.draw.circle(sprite, colour[:3], (radius, radius), radius)
+            sprite = cls.finish_sprite(sprite)
+            if colour[3] < 255: #the invalid body stays see-through, as surface alpha on top of the colour key
+                sprite.set_alpha(colour[3], pygame.RLEACCEL)
+            cls.bodies[valid] = sprite
+        return sprite
+
+    @classmethod
+    def get_rings(cls, editing, overlay):
+        key = (editing, overlay)
+        sprite = cls.rings.get(key)
+        if sprite is None:
+            zoom = cls.spriteZoom
+            radius = cls.spriteRadius
+            ring = int(cls.size * 1.1 * zoom + 0.5)
+            outer = int((cls.size + 8) * zoom + 0.5) if overlay is not None else ring
+            sprite = cls.new_sprite(outer)
+            if overlay is not None:
+                pygame.draw.circle(sprite, cls.overlayColours[overlay], (outer, outer), outer, max(1, int(4 * zoom + 0.5)))
+            if editing:
+                pygame.draw.circle(sprite, cls.selectedColour, (outer, outer), ring, max(1, ring - radius))
+            sprite = cls.rings[key] = cls.finish_sprite(sprite)
+        return sprite
+
+    @classmethod
+    def get_labelled(cls, label):
+        #valid body with the label drawn in, or None if the label sticks out of the circle at this zoom
+        key = (label, cls.spriteRadius)
+        labelled = cls.labelled
+        entry = labelled.get(key)
+        if entry is not None:
+            labelled.move_to_end(key)
+            entry[1] = cls.frame
+            return entry[0]
+        if cls.labelledBytes > cls.maxLabelledBytes and next(iter(labelled.values()))[1] == cls.frame:
+            return None #more labels on screen than fit: evicting would redraw every one of them every frame
+        radius = cls.spriteRadius
+        width, height = label.get_size()
+        glyphs = label.get_bounding_rect()
+        dx = max(width / 2 - glyphs.left, glyphs.right - width / 2)
+        dy = max(height / 2 - glyphs.top, glyphs.bottom - height / 2)
+        sprite = None
+        if dx * dx + dy * dy <= radius * radius:
+            sprite = cls.new_sprite(radius)
+            pygame.draw.circle(sprite, cls.colour[:3], (radius, radius), radius)
+            sprite.blit(label, label.get_rect(center=(radius, radius)))
+            sprite = cls.finish_sprite(sprite)
+            cls.labelledBytes += sprite.get_width() * sprite.get_height() * 4
+        labelled[key] = [sprite, cls.frame]
+        while cls.labelledBytes > cls.maxLabelledBytes and next(iter(labelled.values()))[1] != cls.frame:
+            old = labelled.popitem(last=False)[1][0]
+            if old is not None:
+                cls.labelledBytes -= old.get_width() * old.get_height() * 4
+        return sprite
 
     def check_press(self, mousePos):
-        vector = pygame.math.Vector2(mousePos[0] - self.circle.pos.x, mousePos[1] - self.circle.pos.y)
-        return vector.magnitude() < self.size
+        dx = mousePos[0] - self.pos.x
+        dy = mousePos[1] - self.pos.y
+        return dx * dx + dy * dy < self.size * self.size
     
     def check_nodeCollision(self, pos):
-        vector = pygame.math.Vector2(pos[0] - self.circle.pos.x, pos[1] - self.circle.pos.y)
-        return vector.magnitude() < 2.8*self.size
+        dx = pos[0] - self.pos.x
+        dy = pos[1] - self.pos.y
+        return dx * dx + dy * dy < (2.8*self.size) ** 2
+
+    def get_hitbox(self):
+        return (self.pos.x - self.size, self.pos.y - self.size, 2 * self.size, 2 * self.size)
+
+    def get_bounds(self):
+        #screen space
+        x, y = camera.to_screen(self.pos)
+        radius = int(self.size * 1.1 * camera.zoom) + 2
+        bounds = pygame.Rect(x - radius, y - radius, 2 * radius, 2 * radius)
+        if camera.show_detail():
+            bounds.union_ip(self.label.get_rect(center=(x, y)))
+            if self.overlay is not None:
+                radius = int((self.size + 10) * camera.zoom) + 2
+                bounds.union_ip((x - radius, y - radius, 2 * radius, 2 * radius))
+            if self.overlayDistance is not None:
+                bounds.union_ip(self.get_distanceRect())
+        return bounds
+
+    def get_distanceRect(self):
+        x, y = camera.to_screen(self.pos)
+        rect = textCache.render(self.overlayDistance, 18, self.overlayTextColour).get_rect()
+        rect.midbottom = (x, y - (self.size + 8) * camera.zoom)
+        return rect
+
+    def set_overlay(self, overlay, distance=None):
+        distance = None if distance is None else format(distance, 'g')
+        if overlay == self.overlay and distance == self.overlayDistance:
+            return
+        dirtyRegions.add(self.get_bounds())
+        self.overlay = overlay
+        self.overlayDistance = distance
+        dirtyRegions.add(self.get_bounds())
+
+    def mark_dirty(self):
+        dirtyRegions.add(self.get_bounds())
+        for edge in self.edges:
+            dirtyRegions.add(edge.get_bounds())
 
     def set_pos(self, x, y):
-        self.circle.set_pos(x, y)
-        self.highlight.set_pos(x, y)
-        self.text.set_pos(x, y)
-        if self.valid: self.lastValidPos = pygame.Vector2(x, y)
+        self.mark_dirty()
+        self.pos.update(x, y)
+        if self.valid: self.lastValidPos = (x, y)
+        for edge in self.edges:
+            edge.place_label()
+        self.mark_dirty()
 
     def set_text(self, text:str):
-        self.displayNum = int(text)
         if not text.isnumeric():
             return
-        self.text.set_text(text)
+        self.displayNum = int(text)
+        self.label = self.get_label(text)
+        dirtyRegions.add(self.get_bounds())
+
+    def set_displayNum(self, displayNum):
+        #called while drawing, so nothing to mark dirty
+        if displayNum != self.displayNum:
+            self.displayNum = displayNum
+            self.label = self.get_label(str(displayNum))
 
     def set_valid(self, valid):
+        if valid != self.valid:
+            dirtyRegions.add(self.get_bounds())
         self.valid = valid
-        if self.valid:
-            self.circle.colour = self.colour
-        else:
-            self.circle.colour = self.invalidColour
 
     def set_editing(self, editing):
+        if editing != self.editing:
+            dirtyRegions.add(self.get_bounds())
         self.editing = editing
-        self.highlight.visible = editing
 
     def get_pos(self):
-        return self.circle.pos
+        return self.pos
     
     def move_to_last_valid(self):
-        self.set_pos(self.lastValidPos.x, self.lastValidPos.y)
+        self.set_pos(*self.lastValidPos)
+
+    def add_sprites(self, batch, detail):
+        #appends (surface, position) pairs for Surface.blits
+        zoom = camera.zoom
+        if zoom != self.spriteZoom:
+            Node.set_spriteZoom(zoom)
+        pos = self.pos
+        x = int((pos.x - camera.x) * zoom) #camera.to_screen inlined, this runs for every visible node
+        y = int((pos.y - camera.y) * zoom)
+        half = self.spriteRadius
+        sprite = self.get_labelled(self.label) if detail and self.valid else None #an invalid body is translucent under an opaque label
+        if sprite is None:
+            sprite = self.bodies.get(self.valid)
+            if sprite is None:
+                sprite = self.get_body(self.valid)
+            batch.append((sprite, (x - half, y - half)))
+            if detail:
+                width, height = self.label.get_size()
+                batch.append((self.label, (x - (width >> 1), y - (height >> 1))))
+        else:
+            batch.append((sprite, (x - half, y - half)))
+        overlay = self.overlay if detail else None
+        if self.editing or overlay is not None:
+            rings = self.get_rings(self.editing, overlay)
+            half = rings.get_width() >> 1
+            batch.append((rings, (x - half, y - half)))
+        if detail and self.overlayDistance is not None:
+            batch.append((textCache.render(self.overlayDistance, 18, self.overlayTextColour), self.get_distanceRect()))
 
     def display(self, screen):
-        self.circle.display(screen)
-        self.highlight.display(screen)
-        self.text.display(screen)
+        batch = []
+        self.add_sprites(batch, camera.show_detail())
+        screen.blits(batch, False)
 
 class Drawing_Edge:
 
+    __slots__ = ('node', 'sourcePos', 'endPos', 'displayColour')
+
     colour = (95, 190, 170, 100)
     invalidColour = (210, 77, 77, 100)
     thickness = 8
     
     def __init__(self, node):
         self.node = node
-        self.sourcePos = pygame.Vector2(node.circle.pos.x, node.circle.pos.y)
+        self.sourcePos = pygame.Vector2(node.pos)
         self.displayColour = self.colour
-        self.update((node.circle.pos.x, node.circle.pos.y), False)
+        self.endPos = self.sourcePos
+        self.update(node.pos, False)
 
     def update(self, mousePos, valid):
+        dirtyRegions.add(self.get_bounds())
         self.endPos = pygame.Vector2(mousePos[0], mousePos[1])
         if valid: self.displayColour = self.colour
         else: self.displayColour = self.invalidColour
+        dirtyRegions.add(self.get_bounds())
+
+    def get_bounds(self):
+        return line_bounds(camera.to_screen(self.sourcePos), camera.to_screen(self.endPos), camera.scale_width(self.thickness))
 
     def set_editing(self, x):
         return
 
     def display(self, screen: pygame.Surface):
-        pygame.draw.line(screen, self.displayColour, self.sourcePos, self.endPos, self.thickness)
+        pygame.draw.line(screen, self.displayColour, camera.to_screen(self.sourcePos), camera.to_screen(self.endPos), camera.scale_width(self.thickness))
 
 class Static_Edge:
-   
+
+    # Slotted like Node; the weight label is a shared cached surface plus its
+    # rect centred on the world space midpoint
+
+    __slots__ = ('node1', 'node2', 'editing', 'overlay', 'length', 'label', 'labelRect')
+
     colour = (75, 152, 152, 160)
     selectedColour = (176, 228, 177)
+    overlayColours = {'relaxed' : (255, 170, 60, 200), 'tree' : (120, 220, 120, 220)}
     textColour = (30, 30, 30)
+    fontSize = 20
     thickness = 8
 
     def __init__(self, node1, node2):
         self.node1 = node1
         self.node2 = node2
         self.editing = False
-        self.lengthText = Text(0, 0, '0', self.textColour, 20, anchor='c')
+        self.overlay = None
+        self.length = '0'
+        self.label = textCache.render(self.length, self.fontSize, self.textColour)
+        self.labelRect = self.label.get_rect()
+        self.place_label()
+        node1.edges.add(self)
+        node2.edges.add(self)
 
     def check_press(self, mousePos):
-        m = pygame.math.Vector2(mousePos[0], mousePos[1])
-        p1 = self.node1.get_pos()
-        p2 = self.node2.get_pos()
-        if m.x < min(p1.x, p2.x) or m.x > max(p1.x, p2.x): return False
-        if m.y < min(p1.y, p2.y) or m.y > max(p1.y, p2.y): return False
-        v1 = pygame.math.Vector2(p2.x - p1.x, p2.y - p1.y)  #vector between two node points
-        v2 = v1.rotate(90)  #perpendicular vector to v1, gives shortest distance when passing through m
-        mu = ( (v1.y * (m.x - p1.x)) - (v1.x * (m.y - p1.y)) ) / ( (v1.x * v2.y) - (v1.y * v2.x) )  #constant multiplier for v2 which gives vector from m to point of intersection of v1 and v2
-        return (mu * v2).magnitude() < 6
+        mx, my = mousePos[0], mousePos[1]
+        p1 = self.node1.pos
+        p2 = self.node2.pos
+        if mx < min(p1.x, p2.x) or mx > max(p1.x, p2.x): return False
+        if my < min(p1.y, p2.y) or my > max(p1.y, p2.y): return False
+        dx, dy = p2.x - p1.x, p2.y - p1.y  #vector between two node points
+        #perpendicular distance from m to the line: |cross product| / length
+        return abs(dy * (mx - p1.x) - dx * (my - p1.y)) < 6 * math.hypot(dx, dy)
+
+    def get_hitbox(self):
+        p1 = self.node1.pos
+        p2 = self.node2.pos
+        return (min(p1.x, p2.x), min(p1.y, p2.y), abs(p2.x - p1.x), abs(p2.y - p1.y))
 
     def set_editing(self, editing):
+        if editing != self.editing:
+            dirtyRegions.add(self.get_bounds())
         self.editing = editing
 
+    def set_overlay(self, overlay):
+        if overlay != self.overlay:
+            dirtyRegions.add(self.get_bounds())
+        self.overlay = overlay
+
+    def other_node(self, node):
+        return self.node2 if node is self.node1 else self.node1
+
     def set_length(self, length):
-        self.lengthText.set_text(length)
+        if length == self.length:
+            return
+        dirtyRegions.add(self.get_bounds())
+        self.length = length
+        self.label = textCache.render(length, self.fontSize, self.textColour)
+        self.labelRect = self.label.get_rect(center=self.labelRect.center)
+        dirtyRegions.add(self.get_bounds())
+
+    def place_label(self):
+        #called when an endpoint moves, keeps the label at the midpoint
+        p1 = self.node1.pos
+        p2 = self.node2.pos
+        self.labelRect.center = (int(p1.x + 0.5 * (p2.x - p1.x)), int(p1.y + 0.5 * (p2.y - p1.y)))
+
+    def get_labelRect(self):
+        #screen space
+        return self.label.get_rect(center=camera.to_screen(self.labelRect.center))
+
+    def get_bounds(self):
+        bounds = line_bounds(camera.to_screen(self.node1.pos), camera.to_screen(self.node2.pos), camera.scale_width(self.thickness))
+        if camera.show_detail():
+            bounds.union_ip(self.get_labelRect())
+        return bounds
 
     def display(self, screen):
         if self.editing:
             colour = self.selectedColour
+        elif self.overlay is not None:
+            colour = self.overlayColours[self.overlay]
         else:
             colour = self.colour
-        pygame.draw.line(screen, colour, self.node1.circle.pos, self.node2.circle.pos, self.thickness)
-        p1 = self.node1.get_pos()
-        p2 = self.node2.get_pos()
-        mid = p1 + 0.5 * (p2 - p1)
-        self.lengthText.set_pos(int(mid.x), int(mid.y))
-        self.lengthText.display(screen)
+        pygame.draw.line(screen, colour, camera.to_screen(self.node1.pos), camera.to_screen(self.node2.pos), camera.scale_width(self.thickness))
+        if camera.show_detail():
+            screen.blit(self.label, self.get_labelRect())
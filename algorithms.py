@@ -0,0 +1,118 @@
+import pathfinding, graph_io
+
+# Whole-graph algorithms: connected components and minimum spanning trees.
+# Like pathfinding, they only need nodes and neighbours(id), so every graph
+# backend (and CSR snapshots) can use them. Also the small index structures
+# they and the editor build on.
+
+
+class Union_Find:
+
+    # Disjoint sets over dense indices: parent links in a list, union by
+    # size and path halving, so each operation is effectively O(1)
+
+    def __init__(self, count):
+        self.parent = list(range(count))
+        self.size = [1] * count
+        self.sets = count
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        #False if they were already joined
+        i, j = self.find(i), self.find(j)
+        if i == j:
+            return False
+        if self.size[i] < self.size[j]:
+            i, j = j, i
+        self.parent[j] = i
+        self.size[i] += self.size[j]
+        self.sets -= 1
+        return True
+
+
+class Fenwick_Tree:
+
+    # Prefix sums over a list of counts that only grows at the end: add(),
+    # prefix() and append() are all O(log n). With a 1 per live item it maps
+    # an item's position to its rank among the live ones.
+
+    def __init__(self):
+        self.tree = [0] #1-based, tree[i] sums values (i - lowbit(i), i]
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    def append(self, value):
+        #returns the new position
+        i = len(self.tree)
+        low = i - (i & -i)
+        self.tree.append(value + self.prefix(i - 1) - self.prefix(low))
+        return i - 1
+
+    def add(self, position, delta):
+        tree = self.tree
+        i = position + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count):
+        #sum of the first count values
+        tree = self.tree
+        total = 0
+        while count > 0:
+            total += tree[count]
+            count -= count & -count
+        return total
+
+
+def components(graph):
+    #lists of node ids, one per connected component, largest first
+    ids = list(graph.node_ids())
+    index = {id : i for i, id in enumerate(ids)}
+    sets = Union_Find(len(ids))
+    for id1, id2, _ in graph_io.iter_edges(graph):
+        sets.union(index[id1], index[id2])
+    groups = {}
+    for i, id in enumerate(ids):
+        groups.setdefault(sets.find(i), []).append(id)
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def kruskal(graph):
+    #minimum spanning forest as (total weight, [(node1, node2, weight), ...])
+    ids = list(graph.node_ids())
+    index = {id : i for i, id in enumerate(ids)}
+    sets = Union_Find(len(ids))
+    tree = []
+    total = 0
+    for id1, id2, weight in sorted(graph_io.iter_edges(graph), key=lambda edge: edge[2]):
+        if sets.union(index[id1], index[id2]):
+            tree.append((id1, id2, weight))
+            total += weight
+            if sets.sets == 1:
+                break
+    return total, tree
+
+
+def prim(graph):
+    #same result as kruskal(), grown from each component in turn by the shared best_first traversal
+    tree = []
+    total = 0
+    done = set()
+    for start in graph.node_ids():
+        if start in done:
+            continue
+        weights, previous = pathfinding.best_first(graph, start, additive=False)
+        done.update(previous)
+        for node, parent in previous.items():
+            if parent is not None:
+                tree.append((parent, node, weights[node]))
+                total += weights[node]
+    return total, tree
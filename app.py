@@ -1,33 +1,139 @@
-import graph_editor, graph
+import pygame, os, graph_editor, graph, scheduler, journal, UI, instrumentation
 
 class App:
 
-    def __init__(self):
-        self.graph = graph.Graph()
-        self.graphEditor = graph_editor.Graph_Editor(self.graph)
+    savePath = 'graph.json'
+    perfLogPath = 'perf_log.csv' #rolling log of frame timings while instrumentation is on (.json works too)
+    profilePath = 'profile.prof'
+    stepBudget = 0.004 #seconds per frame given to stepwise algorithms
+
+    def __init__(self, path=None, journalPath=None):
+        #with a journalPath edits are logged there, and a log left behind by a crash is replayed instead of opening path
+        self.journal = journal.Journal(journalPath)
+        recovering = self.journal.has_recovery()
+        snapshot = path is not None and not recovering and os.path.splitext(path)[1].lower() == '.gsnap'
+        #a snapshot is mapped as the graph itself, so algorithms have all of it at once while widgets load
+        self.graph = graph.Mapped_Graph.open(path) if snapshot else graph.Graph()
+        self.scheduler = scheduler.Step_Scheduler()
+        self.graphEditor = graph_editor.Graph_Editor(self.graph, self.scheduler, self.journal)
+        self.pendingMotion = None #latest mouse position not yet given to the editor
+        if recovering:
+            print('recovering unsaved session from', journalPath)
+            self.graphEditor.recover()
+        elif snapshot:
+            self.graphEditor.open_snapshot(path)
+        elif path is not None:
+            self.graphEditor.open_file(path)
 
     def update(self):
-        self.graphEditor.update()
+        instruments = instrumentation.instruments
+        with instruments.timer('update'):
+            self.flush_motion()
+            self.graphEditor.update()
+        with instruments.timer('steps'):
+            self.scheduler.advance(self.stepBudget)
 
     def mouse_down(self, pos, button):
         if button == 1:
             self.graphEditor.l_down(pos)
+        if button == 2:
+            self.graphEditor.m_down(pos)
         if button == 3:
             self.graphEditor.r_down(pos)
 
     def mouse_up(self, pos, button):
         if button == 1:
             self.graphEditor.l_up()
+        if button == 2:
+            self.graphEditor.m_up()
         if button == 3:
             self.graphEditor.r_up(pos)
 
     def mouse_move(self, pos):
         self.graphEditor.mouse_move(pos)
 
+    def flush_motion(self):
+        if self.pendingMotion is not None:
+            pos = self.pendingMotion
+            self.pendingMotion = None
+            self.mouse_move(pos)
+
+    def handle_event(self, event):
+        #motion only keeps the latest position, applied once per frame by update() or before the next other event so ordering holds
+        with instrumentation.instruments.timer('events'):
+            if event.type == pygame.MOUSEMOTION:
+                self.pendingMotion = event.pos
+                return
+            self.flush_motion()
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                self.mouse_down(event.pos, event.button)
+            elif event.type == pygame.MOUSEBUTTONUP:
+                self.mouse_up(event.pos, event.button)
+            elif event.type == pygame.MOUSEWHEEL:
+                self.graphEditor.zoom(pygame.mouse.get_pos(), event.y)
+            elif event.type == pygame.KEYDOWN:
+                self.key_down(event.key)
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+                self.invalidate()
+
     def key_down(self, key):
+        if key == 1073741884: #F3: instrumentation and its HUD on/off
+            self.toggle_instruments()
+            return
+        if key == 1073741885 and instrumentation.instruments.enabled: #F4: write the rolling log now
+            instrumentation.instruments.write_log()
+            print('frame log written to', self.perfLogPath)
+            return
+        if key == 1073741893: #F12: start/stop cProfile
+            stats = instrumentation.instruments.toggle_profile(self.profilePath)
+            print('profiling...' if stats is None else stats + 'saved to ' + self.profilePath)
+            return
         self.graphEditor.key_down(key)
-        if key == 13:
-            print(self.graph.nodes)
+        editingEdge = self.graphEditor.state == graph_editor.Editor_States.editingEdge
+        if key == 13 and not editingEdge: #enter while editing an edge applies the typed weight instead
+            print(self.graph.as_dict())
+        if key == 115 and not editingEdge: #s
+            self.graphEditor.save_file(self.savePath)
+            print('saved to', self.savePath)
+
+    def toggle_instruments(self):
+        instruments = instrumentation.instruments
+        instruments.enable(not instruments.enabled, self.perfLogPath)
+        self.invalidate() #shows or clears the HUD
+
+    def close(self):
+        #a clean exit leaves nothing to recover
+        self.journal.discard()
+        instrumentation.instruments.enable(False) #writes the last frames to the log
+
+    def display(self, screen, area=None):
+        self.graphEditor.display(screen, area)
+
+    def invalidate(self):
+        UI.dirtyRegions.add_all()
+
+    def is_busy(self):
+        return self.graphEditor.is_busy() or self.scheduler.is_busy()
+
+    def needs_redraw(self):
+        return UI.dirtyRegions.pending()
+
+    def render(self, background, screen):
+        #redraws only the regions marked dirty since the last call, returns the rects to push to the display (None for all of it)
+        instruments = instrumentation.instruments
+        with instruments.timer('render'):
+            rects = self.redraw(background, screen)
+        instruments.end_frame()
+        return rects
 
-    def display(self, screen):
-        self.graphEditor.display(screen)
\ No newline at end of file
+    def redraw(self, background, screen):
+        full, rects = UI.dirtyRegions.collect()
+        if not full and len(rects) == 0:
+            return []
+        area = screen.get_rect() if full else rects[0].unionall(rects[1:]).clip(screen.get_rect())
+        #not clipped while drawing: thick lines rasterise differently when cut by a clip rect
+        screen.fill((130, 130, 130, 0), area)
+        self.display(screen, None if full else area)
+        background.fill((130, 130, 130, 0), area)
+        background.blit(screen, area.topleft, area)
+        return None if full else rects
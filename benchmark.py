@@ -0,0 +1,644 @@
+import argparse, math, os, random, sys, time, tracemalloc
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy') #headless: no window needed
+import graph, graph_io, pathfinding
+
+# Run with: python benchmark.py [name ...]
+
+
+def random_sparse_graph(nodeCount, avgDegree=4, seed=0, graphType=graph.Graph):
+    rng = random.Random(seed)
+    g = graphType()
+    for id in range(nodeCount):
+        g.add_node(id)
+    for id in range(1, nodeCount): #spanning chain so everything is reachable
+        g.add_edge(id, rng.randrange(id), rng.randint(1, 100))
+    for _ in range(nodeCount * (avgDegree - 2) // 2):
+        a, b = rng.randrange(nodeCount), rng.randrange(nodeCount)
+        if a != b:
+            g.add_edge(a, b, rng.randint(1, 100))
+    return g
+
+
+def geometric_graph(side, seed=0, graphType=graph.Graph):
+    #jittered grid whose weights are at least the edge length, the case A*'s straight line heuristic is for
+    rng = random.Random(seed)
+    g = graphType()
+    positions = {}
+    for id in range(side * side):
+        positions[id] = ((id % side) * 10 + rng.uniform(-3, 3), (id // side) * 10 + rng.uniform(-3, 3))
+        g.add_node(id)
+    for id in range(side * side):
+        for neighbour in ([id + 1] if id % side + 1 < side else []) + ([id + side] if id + side < side * side else []):
+            length = math.dist(positions[id], positions[neighbour])
+            g.add_edge(id, neighbour, math.ceil(length) + rng.randint(0, 5))
+    return g, positions
+
+
+def naive_dijkstra(g, start):
+    #the original Graph.dijkstra, kept as the reference implementation
+    unvisited = list(g.node_ids())
+    distances = {node : math.inf for node in unvisited}
+    distances[start] = 0
+
+    while len(unvisited) > 0:
+        if min(map(lambda x : distances[x], unvisited)) == math.inf:
+            break
+        currentNode = min(unvisited, key=lambda y : distances[y])
+        currentDst = distances[currentNode]
+        for edge in g.neighbours(currentNode):
+            if edge[0] in unvisited:
+                dst = currentDst + edge[1]
+                if dst < distances[edge[0]]:
+                    distances[edge[0]] = dst
+        unvisited.remove(currentNode)
+    return distances
+
+
+def timed(function, *args, repeats=3):
+    best = math.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(name, seconds):
+    print(f'  {name:<32}{seconds * 1000:>10.2f} ms')
+
+
+def bench_dijkstra(sizes=(500, 2000, 100000)):
+    for size in sizes:
+        g = random_sparse_graph(size)
+        rng = random.Random(size)
+        pairs = [(rng.randrange(size), rng.randrange(size)) for _ in range(5)]
+        print(f'dijkstra: {size} nodes, {sum(len(g.neighbours(n)) for n in g.node_ids()) // 2} edges')
+        if size <= 2000:
+            seconds, reference = timed(naive_dijkstra, g, 0, repeats=1)
+            report('naive (original)', seconds)
+        seconds, (distances, _) = timed(pathfinding.dijkstra, g, 0)
+        report('heap', seconds)
+        if size <= 2000:
+            assert distances == {n : d for n, d in reference.items() if d != math.inf}
+        seconds, _ = timed(lambda: [g.shortest_path(a, b) for a, b in pairs])
+        report('heap, single pair (x5)', seconds)
+        seconds, _ = timed(lambda: [g.shortest_path(a, b, bidirectional=True) for a, b in pairs])
+        report('bidirectional, single pair (x5)', seconds)
+        for a, b in pairs:
+            assert g.shortest_path(a, b)[0] == g.shortest_path(a, b, bidirectional=True)[0]
+
+
+def bench_algorithms(sides=(100, 300), queries=5):
+    import algorithms
+    for side in sides:
+        g, positions = geometric_graph(side)
+        size = side * side
+        rng = random.Random(side)
+        pairs = [(rng.randrange(size), rng.randrange(size)) for _ in range(queries)]
+        print(f'algorithms: {size} node jittered grid, {sum(len(g.neighbours(n)) for n in g.node_ids()) // 2} edges')
+        seconds, _ = timed(pathfinding.bfs, g, 0)
+        report('bfs, whole graph', seconds)
+        seconds, expected = timed(lambda: [pathfinding.shortest_path(g, a, b)[0] for a, b in pairs])
+        report(f'dijkstra, single pair (x{queries})', seconds)
+        seconds, scale = timed(pathfinding.heuristic_scale, g, positions)
+        report('heuristic scale (once per graph)', seconds)
+        seconds, found = timed(lambda: [g.astar(a, b, positions, scale)[0] for a, b in pairs])
+        report(f'a*, single pair (x{queries})', seconds)
+        assert found == expected
+        seconds, groups = timed(algorithms.components, g)
+        report('components (union-find)', seconds)
+        seconds, (total, _) = timed(algorithms.kruskal, g)
+        report('minimum spanning tree, kruskal', seconds)
+        seconds, (primTotal, _) = timed(algorithms.prim, g)
+        report('minimum spanning tree, prim', seconds)
+        assert len(groups) == 1 and total == primTotal
+
+
+def bench_storage(size=200000):
+    print(f'storage: {size} nodes, average degree 4')
+    rng = random.Random(1)
+    queries = [(rng.randrange(size), rng.randrange(size)) for _ in range(100000)]
+    for name, build in [
+        ('Graph', lambda: random_sparse_graph(size)),
+        ('CSR_Graph (frozen)', lambda: random_sparse_graph(size).freeze()),
+    ]:
+        tracemalloc.start()
+        g = build()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        edges = sum(1 for id in g.node_ids() for _ in g.neighbours(id)) // 2
+        print(f'  {name:<32}{memory / edges:>10.1f} bytes/edge')
+        seconds, _ = timed(lambda: [g.has_edge(a, b) for a, b in queries], repeats=1)
+        report('  has_edge x100000', seconds)
+        seconds, _ = timed(g.dijkstra, 0, repeats=1)
+        report('  dijkstra', seconds)
+        if hasattr(g, 'remove_nodes'):
+            seconds, _ = timed(g.remove_nodes, rng.sample(range(size), size // 10), repeats=1)
+            report('  remove_nodes (10%)', seconds)
+
+
+def bench_multi_source(size=20000, sourceCount=64):
+    g = random_sparse_graph(size)
+    sources = list(range(0, size, size // sourceCount))[:sourceCount]
+    print(f'multi source: {size} nodes, {len(sources)} sources, {os.cpu_count()} cpus')
+    seconds, _ = timed(lambda: [g.dijkstra(source) for source in sources], repeats=1)
+    report('dijkstra per source', seconds)
+    for processes in sorted({1, os.cpu_count() or 1}):
+        seconds, _ = timed(pathfinding.distance_matrix, g, sources, processes, repeats=1)
+        report(f'distance_matrix, {processes} processes', seconds)
+
+
+def bench_dynamic(size=50000, edits=200):
+    g = random_sparse_graph(size)
+    rng = random.Random(2)
+    edges = [(id, neighbour) for id in rng.sample(range(size), edits) for neighbour, _ in list(g.neighbours(id))[:1]]
+    print(f'dynamic paths: {size} nodes, {len(edges)} single edge reweights')
+    seconds, _ = timed(lambda: [g.edit_edge(a, b, rng.randint(1, 100)) or pathfinding.dijkstra(g, 0) for a, b in edges[:10]], repeats=1)
+    report('full recompute per edit', seconds / 10)
+    tracker = g.track_paths(0)
+    seconds, _ = timed(lambda: [g.edit_edge(a, b, rng.randint(1, 100)) for a, b in edges], repeats=1)
+    report('incremental repair per edit', seconds / len(edges))
+    assert tracker.distances == pathfinding.dijkstra(g, 0)[0]
+    removals = rng.sample(range(1, size), size // 100)
+    seconds, _ = timed(lambda: [g.remove_node(id) for id in removals[:len(removals) // 2]], repeats=1)
+    report(f'remove_node x{len(removals) // 2}', seconds)
+    seconds, _ = timed(g.remove_nodes, removals[len(removals) // 2:], repeats=1)
+    report(f'remove_nodes, batch of {len(removals) - len(removals) // 2}', seconds)
+    assert tracker.distances == pathfinding.dijkstra(g, 0)[0]
+    tracker.close()
+
+
+def edge_scene(edgeCount):
+    import UI
+    columns = max(2, int(math.sqrt(edgeCount)))
+    nodes = [UI.Node(40 + (i % columns) * 30, 40 + (i // columns) * 30, i, i + 1) for i in range(edgeCount + 1)]
+    edges = [UI.Static_Edge(nodes[i], nodes[i + 1]) for i in range(edgeCount)]
+    for i, edge in enumerate(edges):
+        edge.set_length(str(i % 1000))
+    return nodes, edges
+
+
+def bench_edge_frame(counts=(100, 1000, 5000), frames=20):
+    import pygame
+    pygame.init()
+    screen = pygame.Surface((1200, 750), pygame.SRCALPHA)
+    for count in counts:
+        nodes, edges = edge_scene(count)
+        print(f'edge frame: {count} edges')
+        def static_frame():
+            for edge in edges:
+                edge.display(screen)
+        def drag_frame():
+            pos = nodes[0].get_pos()
+            nodes[0].set_pos(pos.x + 1, pos.y)
+            static_frame()
+        for name, frame in [('static', static_frame), ('dragging one node', drag_frame)]:
+            seconds, _ = timed(lambda: [frame() for _ in range(frames)], repeats=2)
+            print(f'  {name:<32}{seconds * 1000 / frames:>10.2f} ms/frame')
+
+
+def circle_node_display(node, screen, detail):
+    #per node rasterisation, what Node.display did before the sprite cache
+    import pygame, UI
+    pos = UI.camera.to_screen(node.pos)
+    zoom = UI.camera.zoom
+    pygame.draw.circle(screen, node.colour if node.valid else node.invalidColour, pos, max(1, node.size * zoom))
+    if node.editing:
+        radius = node.size * 1.1 * zoom
+        pygame.draw.circle(screen, node.selectedColour, pos, radius, max(1, int(radius - node.size * zoom)))
+    if detail:
+        screen.blit(node.label, node.label.get_rect(center=pos))
+
+
+def bench_node_frame(counts=(200, 3000, 10000), frames=20):
+    #nodes never overlap in the editor, so they sit on a grid and the camera fits them to the window
+    import pygame, UI
+    pygame.init()
+    screen = pygame.display.set_mode((1200, 750)) #sprites and labels are converted to the display format
+    for count in counts:
+        UI.textCache.clear()
+        UI.Node.labels.clear()
+        columns = int(math.sqrt(count * 1.6))
+        nodes = [UI.Node(40 + (i % columns) * 75, 40 + (i // columns) * 75, i, i + 1) for i in range(count)]
+        for node in nodes[::7]:
+            node.set_editing(True)
+        UI.camera.fit((0, 0, columns * 75, (count // columns + 1) * 75), (0, 0, 1200, 750))
+        detail = UI.camera.show_detail()
+        print(f'node frame: {count} nodes, zoom {UI.camera.zoom:.2f}{", labelled" if detail else ""}')
+        def circles():
+            for node in nodes:
+                circle_node_display(node, screen, detail)
+        def sprites():
+            UI.Node.next_frame()
+            batch = []
+            for node in nodes:
+                node.add_sprites(batch, detail)
+            screen.blits(batch, False)
+        for name, frame in [('draw.circle per node', circles), ('sprite blits batch', sprites)]:
+            seconds, _ = timed(lambda: [frame() for _ in range(frames)], repeats=2)
+            print(f'  {name:<32}{seconds * 1000 / frames:>10.2f} ms/frame')
+    UI.camera.reset()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Editor_Session:
+
+    # Drives app.App headlessly: synthetic graph, scripted pygame events, one
+    # update + render per event as the main loop would do
+
+    def __init__(self, journalPath=None):
+        import pygame, app
+        self.pygame = pygame
+        pygame.init()
+        self.background = pygame.display.set_mode((1200, 750))
+        self.screen = pygame.Surface((1200, 750), pygame.SRCALPHA)
+        self.app = app.App(journalPath=journalPath)
+        self.editor = self.app.graphEditor
+        self.frameTimes = []
+        self.operations = {}
+
+    def build_grid(self, columns, rows, spacing=90, seed=0):
+        rng = random.Random(seed)
+        grid = [[self.editor.place_node(70 + c * spacing, 70 + r * spacing) for c in range(columns)] for r in range(rows)]
+        for r in range(rows):
+            for c in range(columns):
+                if c + 1 < columns:
+                    self.editor.add_edge(grid[r][c], grid[r][c + 1], rng.randint(1, 99))
+                if r + 1 < rows:
+                    self.editor.add_edge(grid[r][c], grid[r + 1][c], rng.randint(1, 99))
+        self.frame()
+
+    def frame(self):
+        start = time.perf_counter()
+        self.app.update()
+        self.app.render(self.background, self.screen)
+        self.frameTimes.append(time.perf_counter() - start)
+
+    def event(self, type, **attributes):
+        return self.pygame.event.Event(type, **attributes)
+
+    def run(self, name, events):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            startMemory = tracemalloc.get_traced_memory()[0]
+        startBlocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        for event in events:
+            startFrame = time.perf_counter()
+            self.app.handle_event(event)
+            self.frame()
+            self.frameTimes[-1] = time.perf_counter() - startFrame
+        seconds = time.perf_counter() - start
+        blocks = sys.getallocatedblocks() - startBlocks
+        peak = tracemalloc.get_traced_memory()[1] - startMemory if tracing else 0
+        self.operations.setdefault(name, []).append((seconds, blocks, peak))
+
+    def visible_nodes(self):
+        return [node for node in self.editor.nodes if self.editor.bg.pos_is_in(node.get_pos())]
+
+    def drag(self, node, dx, dy, steps=20):
+        x, y = int(node.get_pos().x), int(node.get_pos().y)
+        pg = self.pygame
+        events = [self.event(pg.MOUSEBUTTONDOWN, pos=(x, y), button=1)]
+        events += [self.event(pg.MOUSEMOTION, pos=(x + dx * i // steps, y + dy * i // steps)) for i in range(1, steps + 1)]
+        events.append(self.event(pg.MOUSEBUTTONUP, pos=(x + dx, y + dy), button=1))
+        self.run('drag node', events)
+
+    def draw_edge(self, node1, node2, steps=10):
+        p1, p2 = node1.get_pos(), node2.get_pos()
+        pg = self.pygame
+        events = [self.event(pg.MOUSEBUTTONDOWN, pos=(int(p1.x), int(p1.y)), button=3)]
+        events += [self.event(pg.MOUSEMOTION, pos=(int(p1.x + (p2.x - p1.x) * i / steps), int(p1.y + (p2.y - p1.y) * i / steps))) for i in range(1, steps + 1)]
+        events.append(self.event(pg.MOUSEBUTTONUP, pos=(int(p2.x), int(p2.y)), button=3))
+        self.run('draw edge', events)
+
+    def edit_weight(self, edge, digits):
+        pos = edge.labelRect.center
+        pg = self.pygame
+        events = [self.event(pg.MOUSEBUTTONDOWN, pos=pos, button=1), self.event(pg.MOUSEBUTTONUP, pos=pos, button=1)]
+        events += [self.event(pg.KEYDOWN, key=48 + int(digit)) for digit in digits]
+        events.append(self.event(pg.KEYDOWN, key=8))
+        self.run('edit weight', events)
+
+    def delete(self, node):
+        pos = (int(node.get_pos().x), int(node.get_pos().y))
+        button = self.editor.remove_button.rect.center
+        pg = self.pygame
+        self.run('delete node', [
+            self.event(pg.MOUSEBUTTONDOWN, pos=pos, button=1), self.event(pg.MOUSEBUTTONUP, pos=pos, button=1),
+            self.event(pg.MOUSEBUTTONDOWN, pos=button, button=1), self.event(pg.MOUSEBUTTONUP, pos=button, button=1),
+        ])
+
+    def drag_flood(self, node, dx, dy, frames=10, perFrame=30, coalesce=True):
+        #fast drag: perFrame motion events queued between frames, handled as the main loop does or one call per event
+        x, y = int(node.get_pos().x), int(node.get_pos().y)
+        pg = self.pygame
+        self.app.handle_event(self.event(pg.MOUSEBUTTONDOWN, pos=(x, y), button=1))
+        self.frame()
+        steps = frames * perFrame
+        start = time.perf_counter()
+        for f in range(frames):
+            for i in range(f * perFrame + 1, (f + 1) * perFrame + 1):
+                pos = (x + dx * i // steps, y + dy * i // steps)
+                if coalesce:
+                    self.app.handle_event(self.event(pg.MOUSEMOTION, pos=pos))
+                else:
+                    self.app.mouse_move(pos)
+            self.frame()
+        seconds = time.perf_counter() - start
+        self.app.handle_event(self.event(pg.MOUSEBUTTONUP, pos=(x + dx, y + dy), button=1))
+        self.frame()
+        return seconds / frames
+
+    def script(self, repeats, seed=0):
+        rng = random.Random(seed)
+        for _ in range(repeats):
+            nodes = self.visible_nodes()
+            self.drag(rng.choice(nodes), rng.choice([-20, 20]), rng.choice([-20, 20]))
+            node1, node2 = rng.sample(self.visible_nodes(), 2)
+            self.draw_edge(node1, node2)
+            edge = rng.choice([edge for edge in self.editor.edges if edge.node1 in nodes and edge.node2 in nodes])
+            self.edit_weight(edge, str(rng.randint(1, 999)))
+            self.delete(rng.choice(self.visible_nodes()))
+
+    def report(self):
+        print(f'  {"operation":<16}{"count":>6}{"mean ms":>10}{"p95 ms":>10}{"net blocks":>12}{"peak KB":>10}')
+        for name, samples in self.operations.items():
+            times = [sample[0] for sample in samples]
+            print(f'  {name:<16}{len(samples):>6}{1000 * sum(times) / len(times):>10.2f}{1000 * percentile(times, 0.95):>10.2f}'
+                  f'{sum(sample[1] for sample in samples) // len(samples):>12}{max(sample[2] for sample in samples) / 1024:>10.1f}')
+        frames = self.frameTimes
+        print(f'  frame time ({len(frames)} frames): p50 {1000 * percentile(frames, 0.5):.2f} ms, '
+              f'p90 {1000 * percentile(frames, 0.9):.2f} ms, p99 {1000 * percentile(frames, 0.99):.2f} ms, '
+              f'max {1000 * max(frames):.2f} ms')
+
+
+def bench_editor(grids=((12, 6), (60, 40)), repeats=10):
+    for columns, rows in grids:
+        #timings and allocations in separate passes so tracemalloc does not skew latency
+        for traced in (False, True):
+            session = Editor_Session()
+            session.build_grid(columns, rows)
+            if traced:
+                print(f'editor: {columns}x{rows} grid, allocations (traced pass, timings inflated)')
+                tracemalloc.start()
+            else:
+                print(f'editor: {columns}x{rows} grid, {len(session.editor.nodes)} nodes, {len(session.editor.edges)} edges')
+            session.script(repeats)
+            tracemalloc.stop()
+            session.report()
+
+
+def bench_motion(columns=60, rows=40, perFrame=(1, 10, 50), frames=20):
+    session = Editor_Session()
+    session.build_grid(columns, rows)
+    editor = session.editor
+    moves = []
+    mouse_move = editor.mouse_move
+    editor.mouse_move = lambda pos: (moves.append(pos), mouse_move(pos))
+    print(f'motion: {columns}x{rows} grid, dragging a node')
+    print(f'  {"events/frame":<14}{"per event ms":>14}{"moves":>8}{"coalesced ms":>14}{"moves":>8}')
+    for count in perFrame:
+        row = f'  {count:<14}'
+        for coalesce in (False, True):
+            visible = session.visible_nodes()
+            node = visible[len(visible) // 2]
+            moves.clear()
+            seconds = session.drag_flood(node, 40, 40, frames, count, coalesce)
+            row += f'{seconds * 1000:>14.2f}{len(moves):>8}'
+            editor.undo()
+        print(row)
+
+
+def bench_instruments(columns=60, rows=40, repeats=5, calls=1000000):
+    import instrumentation
+    instruments = instrumentation.instruments
+    print('instruments: cost of the hooks')
+    for enabled in (False, True):
+        instruments.enable(enabled)
+        def counts():
+            for _ in range(calls):
+                instruments.count('hit tests')
+        def timers():
+            for _ in range(calls):
+                with instruments.timer('display'):
+                    pass
+        state = 'enabled' if enabled else 'disabled'
+        for name, function in [('count()', counts), ('timer()', timers)]:
+            seconds, _ = timed(function, repeats=1)
+            print(f'  {name + " " + state:<32}{seconds * 1e9 / calls:>10.0f} ns/call')
+        session = Editor_Session()
+        session.build_grid(columns, rows)
+        session.script(repeats)
+        print(f'  {"editor frame p50 " + state:<32}{1000 * percentile(session.frameTimes, 0.5):>10.2f} ms')
+    instruments.enable(False)
+
+
+def bench_delete(grids=((30, 20), (100, 100)), deletes=50):
+    #deleting early nodes renumbers every later one
+    for columns, rows in grids:
+        session = Editor_Session()
+        session.build_grid(columns, rows)
+        editor = session.editor
+        def delete():
+            for node in list(editor.nodes)[:deletes]:
+                editor.delete_node(node)
+                session.frame()
+        seconds, _ = timed(delete, repeats=1)
+        print(f'delete: {columns}x{rows} grid, early nodes{seconds * 1000 / deletes:>14.2f} ms per delete and frame')
+
+
+def grid_snapshot(side, seed=0):
+    #CSR arrays of a side x side grid built with numpy, for graphs too big to build edge by edge
+    import array, numpy
+    rng = numpy.random.default_rng(seed)
+    ids = numpy.arange(side * side, dtype=numpy.int64)
+    right = ids[ids % side + 1 < side]
+    down = ids[ids + side < side * side]
+    source = numpy.concatenate([right, down])
+    target = numpy.concatenate([right + 1, down + side])
+    weight = rng.integers(1, 100, len(source)).astype(numpy.float64)
+    source, target, weight = numpy.concatenate([source, target]), numpy.concatenate([target, source]), numpy.concatenate([weight, weight])
+    order = numpy.argsort(source, kind='stable')
+    offsets = numpy.concatenate([[0], numpy.cumsum(numpy.bincount(source, minlength=side * side))])
+    def as_array(values, code):
+        result = array.array(code)
+        result.frombytes(values.astype(numpy.int64 if code == 'q' else numpy.float64).tobytes())
+        return result
+    return graph.CSR_Graph(as_array(ids, 'q'), as_array(offsets, 'q'), as_array(target[order], 'q'), as_array(weight[order], 'd'))
+
+
+def bench_snapshot(sides=(300, 1500), loadLimit=300, path='benchmark_snapshot.gsnap'):
+    #time to a usable graph: mapping a snapshot against streaming the same graph into a Graph
+    for side in sides:
+        snapshot = grid_snapshot(side)
+        print(f'snapshot: {side}x{side} grid, {snapshot.node_count()} nodes, {snapshot.edge_count()} edges')
+        seconds, _ = timed(graph_io.write_snapshot, snapshot, path, repeats=1)
+        report(f'  write ({os.path.getsize(path) >> 20} MB)', seconds)
+        seconds, g = timed(graph.Mapped_Graph.open, path, repeats=1)
+        report('  open (mmap)', seconds)
+        start, end = side * (side // 2), side * (side // 2) + 20
+        seconds, _ = timed(g.shortest_path, start, end, repeats=1)
+        report('  first shortest path, 20 apart', seconds)
+        seconds, _ = timed(lambda: [g.add_edge(start + i, end + i, 1) for i in range(1000)], repeats=1)
+        report(f'  1000 edits ({len(g.edited)} rows copied)', seconds)
+        if side <= loadLimit:
+            graph_io.write_binary(snapshot, 'benchmark_snapshot.bin')
+            seconds, _ = timed(lambda: graph_io.load(graph.Graph(), graph_io.read_binary('benchmark_snapshot.bin')), repeats=1)
+            report('  load .bin into Graph', seconds)
+            os.remove('benchmark_snapshot.bin')
+        del g
+        os.remove(path)
+
+
+def bench_viewport(grids=((30, 20), (100, 100)), frames=10):
+    import UI
+    for columns, rows in grids:
+        session = Editor_Session()
+        session.build_grid(columns, rows)
+        editor = session.editor
+        print(f'viewport: {columns}x{rows} grid, {len(editor.nodes)} nodes, {len(editor.edges)} edges, full redraws')
+        def redraw():
+            session.app.invalidate()
+            session.app.render(session.background, session.screen)
+        def draw_everything():
+            for edge in editor.edges:
+                edge.display(session.screen)
+            for node in editor.nodes:
+                node.display(session.screen)
+        width = 70 + columns * 90
+        height = 70 + rows * 90
+        views = [
+            ('every widget, no culling', None, draw_everything),
+            ('zoom 1, culled', lambda: UI.camera.reset(), redraw),
+            ('zoom 0.5, culled', lambda: UI.camera.zoom_at((20, 20), 0.5), redraw),
+            ('fit whole graph, lod', lambda: UI.camera.fit((0, 0, width, height), editor.bg.rect), redraw),
+        ]
+        for name, setup, frame in views:
+            UI.camera.reset()
+            if setup is not None:
+                setup()
+            seconds, _ = timed(lambda: [frame() for _ in range(frames)], repeats=2)
+            print(f'  {name:<32}{seconds * 1000 / frames:>10.2f} ms/frame  (zoom {UI.camera.zoom:.2f})')
+        UI.camera.reset()
+
+
+def bench_journal(columns=30, rows=20, edits=1800):
+    import tempfile, app
+    with tempfile.TemporaryDirectory() as directory:
+        for journalPath in (None, os.path.join(directory, 'graph.journal')):
+            session = Editor_Session(journalPath)
+            session.build_grid(columns, rows)
+            editor = session.editor
+            editor.journal.snapshot() #the grid is the base state, as after opening a file
+            print(f'journal: {len(editor.nodes)} nodes, {edits} weight edits, ' + ('in memory' if journalPath is None else 'logged to disk'))
+            rng = random.Random(4)
+            pairs = [(edge.node1.id, edge.node2.id) for edge in editor.edges]
+            def edit():
+                slowest = 0
+                for _ in range(edits):
+                    start = time.perf_counter()
+                    id1, id2 = rng.choice(pairs)
+                    editor.do(('edit_edge', id1, id2, editor.graph.get_weight(id1, id2), rng.randint(1, 99)))
+                    session.app.update() #journal snapshots are copied and written between edits, as between frames
+                    slowest = max(slowest, time.perf_counter() - start)
+                return slowest
+            seconds, slowest = timed(edit, repeats=1)
+            report('do and update per edit', seconds / edits)
+            report('slowest do and update', slowest)
+            seconds, _ = timed(lambda: [editor.undo() or session.app.update() for _ in range(edits)], repeats=1)
+            report('undo and update per edit', seconds / edits)
+            seconds, _ = timed(lambda: [editor.redo() or session.app.update() for _ in range(edits)], repeats=1)
+            report('redo and update per edit', seconds / edits)
+            if journalPath is not None:
+                def recover():
+                    recovered = app.App(journalPath=journalPath)
+                    while recovered.graphEditor.pendingImport is not None:
+                        recovered.graphEditor.update()
+                    return recovered
+                seconds, recovered = timed(recover, repeats=1)
+                report(f'recovery ({editor.journal.sinceSnapshot} log lines)', seconds)
+                assert recovered.graph.as_dict() == editor.graph.as_dict()
+                session.app.close()
+
+
+def bench_weight_edit(columns=60, rows=40, edits=20, digits='12345'):
+    session = Editor_Session()
+    session.build_grid(columns, rows)
+    editor = session.editor
+    updates = []
+    editor.graph.add_listener(lambda event, *args: updates.append(event))
+    tracker = editor.graph.track_paths(next(iter(editor.nodes)).id) #a downstream listener that repairs on every edit
+    rng = random.Random(5)
+    pg = session.pygame
+    print(f'weight edit: {len(editor.nodes)} nodes, {edits} edges typed as {digits!r} + enter, shortest path tree listening')
+    onScreen = [edge for edge in editor.edges if editor.bg.rect.inflate(-20, -20).collidepoint(edge.labelRect.center)]
+    for edge in rng.sample(onScreen, edits):
+        session.edit_weight(edge, digits) #click, digits, backspace
+        session.run('enter', [session.event(pg.KEYDOWN, key=13)])
+    typed = sum(seconds for seconds, _, _ in session.operations['edit weight'])
+    report('per keystroke', typed / (edits * (len(digits) + 1)))
+    report('commit (enter)', sum(seconds for seconds, _, _ in session.operations['enter']) / edits)
+    print(f'  graph updates per edited edge{len(updates) / edits:>12.1f}')
+    tracker.close()
+
+
+def bench_layout(sizes=(300, 1000, 10000), iterations=5):
+    import layout
+    for size in sizes:
+        g = random_sparse_graph(size, avgDegree=3)
+        rng = random.Random(3)
+        positions = [(rng.uniform(0, 1000), rng.uniform(0, 500)) for _ in range(size)]
+        edges = [(a, b) for a, b, _ in graph_io.iter_edges(g)]
+        print(f'layout: {size} nodes, {len(edges)} edges')
+        modes = [('grid', 0)] if size > 2000 else [('exact', size), ('grid', 0)]
+        for name, exactLimit in modes:
+            forces = layout.Force_Layout(positions, edges, (0, 0, 1000, 500))
+            forces.exactLimit = exactLimit
+            seconds, _ = timed(forces.step, iterations, repeats=1)
+            report(f'{name} repulsion per iteration', seconds / iterations)
+            slices = forces.iteration(250)
+            slowest = 0
+            while True: #one iteration as the editor runs it, a frame per slice
+                start = time.perf_counter()
+                finished = next(slices, True)
+                slowest = max(slowest, time.perf_counter() - start)
+                if finished:
+                    break
+            report(f'{name} slowest 250 node slice', slowest)
+
+
+benchmarks = {
+    'dijkstra' : bench_dijkstra,
+    'algorithms' : bench_algorithms,
+    'storage' : bench_storage,
+    'multi_source' : bench_multi_source,
+    'dynamic' : bench_dynamic,
+    'edge_frame' : bench_edge_frame,
+    'node_frame' : bench_node_frame,
+    'editor' : bench_editor,
+    'viewport' : bench_viewport,
+    'motion' : bench_motion,
+    'instruments' : bench_instruments,
+    'delete' : bench_delete,
+    'snapshot' : bench_snapshot,
+    'journal' : bench_journal,
+    'weight_edit' : bench_weight_edit,
+    'layout' : bench_layout,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('names', nargs='*', help=', '.join(benchmarks))
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in benchmarks:
+            parser.error(f'unknown benchmark {name!r}')
+    for name in args.names or benchmarks:
+        benchmarks[name]()
@@ -1,51 +1,525 @@
-import math
+import array, collections, math
+import pathfinding, algorithms, instrumentation, graph_io
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def done(value):
+    #a step generator that finishes at once, returning value
+    return value
+    yield
+
+
+class Path_Cache:
+
+    # LRU cache of full single-source results, emptied whenever the graph's
+    # version moves on
+
+    def __init__(self, maxSize=64):
+        self.maxSize = maxSize
+        self.results = collections.OrderedDict()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source, version):
+        if version != self.version:
+            self.results.clear()
+            self.version = version
+        result = self.results.get(source)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.results.move_to_end(source)
+        return result
+
+    def peek(self, source, version):
+        #a cached result without touching the statistics or the LRU order
+        return self.results.get(source) if version == self.version else None
+
+    def put(self, source, version, result):
+        if version != self.version:
+            return
+        self.results[source] = result
+        if len(self.results) > self.maxSize:
+            self.results.popitem(last=False)
+
+    def info(self):
+        return {'hits' : self.hits, 'misses' : self.misses, 'size' : len(self.results), 'maxSize' : self.maxSize, 'version' : self.version}
+
 
 class Graph:
 
     def __init__(self):
         self.nodes = {}
+        self.version = 0 #bumped by every mutation
+        self.pathCache = Path_Cache()
+        self.listeners = []
+
+    def add_listener(self, listener):
+        #listener(event, *args) is called after every mutation, e.g. ('edit_edge', node1, node2, weight)
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def changed(self, event, *args):
+        self.version += 1
+        instrumentation.instruments.count('graph mutations')
+        for listener in self.listeners:
+            listener(event, *args)
+
+    def track_paths(self, source):
+        return pathfinding.Dynamic_Shortest_Paths(self, source)
+
+    # nodes maps each id to a {neighbour : weight} dict, so an edge is found
+    # or removed in O(1) and removing a node costs O(degree). drop_node and
+    # drop_edge mutate without notifying, so the batch removals below change
+    # everything first and then tell listeners once.
 
     def add_node(self, id):
-        self.nodes[id] = []
+        self.nodes[id] = {}
+        self.changed('add_node', id)
+
+    def drop_node(self, id):
+        for neighbour in self.nodes.pop(id):
+            if neighbour != id:
+                del self.nodes[neighbour][id]
 
     def remove_node(self, id):
-        self.nodes.pop(id)
+        self.drop_node(id)
+        self.changed('remove_node', id)
+
+    def remove_nodes(self, ids):
+        #one ('remove_nodes', ids) event for the whole batch
+        ids = list(ids)
+        for id in ids:
+            self.drop_node(id)
+        self.changed('remove_nodes', ids)
 
     def add_edge(self, node1, node2, weight):
-        self.nodes[node1].append((node2, weight))
-        self.nodes[node2].append((node1, weight))
+        self.nodes[node1][node2] = weight
+        self.nodes[node2][node1] = weight
+        self.changed('add_edge', node1, node2, weight)
 
     def edit_edge(self, node1, node2, weight):
-        self.remove_edge(node1, node2)
-        self.add_edge(node1, node2, weight)
+        self.nodes[node1][node2] = weight
+        self.nodes[node2][node1] = weight
+        self.changed('edit_edge', node1, node2, weight)
+
+    def drop_edge(self, node1, node2):
+        self.nodes[node1].pop(node2, None)
+        self.nodes[node2].pop(node1, None)
 
     def remove_edge(self, node1, node2):
-        for edge in self.nodes[node1]:
-            if edge[0] == node2:
-                self.nodes[node1].remove(edge)
-        
-        for edge in self.nodes[node2]:
-            if edge[0] == node1:
-                self.nodes[node2].remove(edge)
-
-    def dijkstra(self, start):
-        unvisited = list(self.nodes.keys())
-        distances = {node : math.inf for node in unvisited}
-        distances[start] = 0
-
-        while len(unvisited) > 0:
-            if min(map(lambda x : distances[x], unvisited)) == math.inf:
-                break
-            currentNode = min(unvisited, key=lambda y : distances[y])
-            currentDst = distances[currentNode]
-            for edge in self.nodes[currentNode]:
-                if edge[0] in unvisited:
-                    dst = currentDst + edge[1]
-                    if dst < distances[edge[0]]:
-                        distances[edge[0]] = dst
-            unvisited.remove(currentNode)
-
-        print(distances)
+        self.drop_edge(node1, node2)
+        self.changed('remove_edge', node1, node2)
+
+    def remove_edges(self, pairs):
+        #one ('remove_edges', pairs) event for the whole batch
+        pairs = list(pairs)
+        for node1, node2 in pairs:
+            self.drop_edge(node1, node2)
+        self.changed('remove_edges', pairs)
+
+    def neighbours(self, id):
+        return self.nodes[id].items()
+
+    def has_node(self, id):
+        return id in self.nodes
+
+    def has_edge(self, node1, node2):
+        return node2 in self.nodes[node1]
+
+    def get_weight(self, node1, node2):
+        return self.nodes[node1].get(node2)
+
+    def node_count(self):
+        return len(self.nodes)
+
+    def node_ids(self):
+        return self.nodes.keys()
+
+    def as_dict(self):
+        #a copy as {id : {neighbour : weight}}, for printing and comparing graphs
+        return {id : dict(self.neighbours(id)) for id in self.node_ids()}
+
+    @classmethod
+    def from_dict(cls, nodes):
+        #the other way round from as_dict(), keeping nodes itself rather than a copy
+        graph = cls()
+        graph.nodes = nodes
+        return graph
+
+    def freeze(self):
+        return CSR_Graph.from_graph(self)
+
+    def freeze_steps(self):
+        #freeze() as a generator for the step scheduler; the snapshot is its return value
+        return CSR_Graph.from_graph_steps(self)
+
+    def dijkstra(self, start, end=None):
+        #full results are cached per source until the next mutation; treat them as read-only
+        if end is not None: #early exit results are partial: neither cached nor counted as cache misses
+            cached = self.pathCache.peek(start, self.version)
+            if cached is not None:
+                return cached
+            with instrumentation.instruments.timer('algorithms'):
+                return pathfinding.dijkstra(self, start, end)
+        result = self.pathCache.get(start, self.version)
+        if result is not None:
+            return result
+        with instrumentation.instruments.timer('algorithms'):
+            result = pathfinding.dijkstra(self, start)
+        self.pathCache.put(start, self.version, result)
+        return result
+
+    def shortest_path(self, start, end, bidirectional=False):
+        if bidirectional:
+            with instrumentation.instruments.timer('algorithms'):
+                return pathfinding.bidirectional_dijkstra(self, start, end)
+        distances, previous = self.dijkstra(start, end)
+        if end not in distances:
+            return math.inf, []
+        return distances[end], pathfinding.reconstruct_path(previous, end)
+
+    def astar(self, start, end, positions, scale=None):
+        #positions maps ids to (x, y); pass scale (pathfinding.heuristic_scale) when running many queries on one graph
+        with instrumentation.instruments.timer('algorithms'):
+            if scale is None:
+                scale = pathfinding.heuristic_scale(self, positions)
+            return pathfinding.astar(self, start, end, pathfinding.euclidean(positions, end, scale))
+
+    def bfs(self, start, end=None):
+        with instrumentation.instruments.timer('algorithms'):
+            return pathfinding.bfs(self, start, end)
+
+    def components(self):
+        with instrumentation.instruments.timer('algorithms'):
+            return algorithms.components(self)
+
+    def minimum_spanning_tree(self, method='kruskal'):
+        with instrumentation.instruments.timer('algorithms'):
+            if method == 'prim':
+                return algorithms.prim(self)
+            return algorithms.kruskal(self)
+
+    def cache_info(self):
+        return self.pathCache.info()
+
+
+class CSR_Graph:
+
+    # Frozen compressed sparse row snapshot: the neighbours of the node at
+    # index i are targets[offsets[i]:offsets[i + 1]], stored as node indices.
+    # The arrays can be anything indexable, including memoryviews over a
+    # mapped snapshot file.
+
+    def __init__(self, ids, offsets, targets, weights, index=None):
+        self.ids = ids
+        self.indexCache = index
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.path = None #the snapshot file the arrays are mapped from, if any
+
+    @classmethod
+    def open(cls, path):
+        #maps a graph_io snapshot without reading it
+        return cls.from_mapping(*graph_io.map_snapshot(path)[:5], path)
+
+    @classmethod
+    def from_mapping(cls, flags, ids, offsets, targets, weights, path=None):
+        index = Dense_Index(ids[0], len(ids)) if flags & graph_io.snapshotDenseIds else None
+        snapshot = cls(ids, offsets, targets, weights, index)
+        snapshot.path = path
+        return snapshot
+
+    @property
+    def index(self):
+        #id -> index, built on first use so opening a mapped snapshot does not touch every id
+        if self.indexCache is None:
+            self.indexCache = {id : i for i, id in enumerate(self.ids)}
+        return self.indexCache
+
+    @classmethod
+    def from_graph(cls, graph):
+        steps = cls.from_graph_steps(graph)
+        while True:
+            try:
+                next(steps)
+            except StopIteration as stop:
+                return stop.value
+
+    @classmethod
+    def from_graph_steps(cls, graph, batch=512):
+        #yields after every batch nodes, so a big copy can be spread over frames; returns the snapshot
+        ids = list(graph.node_ids())
+        index = {}
+        for start in range(0, len(ids), batch):
+            index.update(zip(ids[start:start + batch], range(start, start + batch)))
+            yield
+        offsets = array.array('q', [0])
+        targets = array.array('q')
+        weights = array.array('d')
+        for start in range(0, len(ids), batch):
+            for id in ids[start:start + batch]:
+                for neighbour, weight in graph.neighbours(id):
+                    targets.append(index[neighbour])
+                    weights.append(weight)
+                offsets.append(len(targets))
+            yield
+        return cls(ids, offsets, targets, weights, index)
+
+    def neighbours(self, id):
+        i = self.index[id]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return zip(map(self.ids.__getitem__, self.targets[start:end]), self.weights[start:end])
+
+    def neighbour_indices(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.targets[start:end], self.weights[start:end]
+
+    def has_node(self, id):
+        return id in self.index
+
+    def has_edge(self, node1, node2):
+        i = self.index[node1]
+        return self.index[node2] in self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def get_weight(self, node1, node2):
+        targets, weights = self.neighbour_indices(self.index[node1])
+        j = self.index[node2]
+        for k in range(len(targets)):
+            if targets[k] == j:
+                return weights[k]
+        return None
+
+    def node_count(self):
+        return len(self.ids)
+
+    def node_ids(self):
+        return self.ids
+
+    def edge_count(self):
+        return len(self.targets) // 2
+
+    def as_numpy(self):
+        if numpy is None:
+            raise ImportError('numpy is required for CSR_Graph.as_numpy')
+        return (numpy.frombuffer(self.offsets, dtype=numpy.int64),
+                numpy.frombuffer(self.targets, dtype=numpy.int64),
+                numpy.frombuffer(self.weights, dtype=numpy.float64))
+
+    def freeze(self):
+        return self
+
+    def freeze_steps(self):
+        return done(self)
+
+    def dijkstra(self, start, end=None):
+        endIndex = -1 if end is None else self.index[end]
+        dist, prev = pathfinding.csr_dijkstra(self.offsets, self.targets, self.weights, self.index[start], endIndex)
+        ids = self.ids
+        distances = {}
+        previous = {}
+        for i, d in enumerate(dist):
+            if d != math.inf and (end is None or d <= dist[endIndex]):
+                distances[ids[i]] = d
+                previous[ids[i]] = None if prev[i] == -1 else ids[prev[i]]
+        return distances, previous
+
+    def shortest_path(self, start, end, bidirectional=False):
+        if bidirectional:
+            return pathfinding.bidirectional_dijkstra(self, start, end)
+        return pathfinding.shortest_path(self, start, end)
+
+
+class Dense_Index:
+
+    # id -> index for the ids first, first + 1, ..., without a dict
+
+    def __init__(self, first, count):
+        self.first = first
+        self.count = count
+
+    def __getitem__(self, id):
+        if type(id) == int and 0 <= id - self.first < self.count:
+            return id - self.first
+        raise KeyError(id)
+
+    def __contains__(self, id):
+        return type(id) == int and 0 <= id - self.first < self.count
+
+    def get(self, id, default=None):
+        return id - self.first if id in self else default
+
+
+class Mapped_Graph(Graph):
+
+    # Editable graph over a CSR_Graph opened from a snapshot file. Opening
+    # only maps the file; a node's neighbours are read from the mapped arrays
+    # until an edit touches the node, which copies its row into a dict that
+    # replaces it from then on. Untouched rows are never turned into objects.
+
+    def __init__(self, base, positions=None, integerWeights=False):
+        self.base = base
+        self.basePositions = positions
+        self.integerWeights = integerWeights
+        self.edited = {} #id -> {neighbour : weight} for nodes edited or added since opening
+        self.removed = set() #ids of removed base nodes
+        self.nodeCount = base.node_count()
+        self.version = 0
+        self.pathCache = Path_Cache()
+        self.listeners = []
+
+    @classmethod
+    def open(cls, path):
+        flags, ids, offsets, targets, weights, positions = graph_io.map_snapshot(path)
+        base = CSR_Graph.from_mapping(flags, ids, offsets, targets, weights, path)
+        return cls(base, positions, bool(flags & graph_io.snapshotIntegerWeights))
+
+    def node_ids(self):
+        #a live view rather than a list, listing the ids would touch every mapped row
+        return Mapped_Ids(self)
+
+    def max_id(self):
+        #dense ids are read off the header, others take one pass over the mapped array
+        index = self.base.indexCache
+        top = index.first + index.count - 1 if isinstance(index, Dense_Index) else max(self.base.ids, default=0)
+        return max(top, max(self.edited, default=0))
+
+    def position(self, id):
+        #the position stored in the snapshot, or None
+        i = self.base.index.get(id)
+        if self.basePositions is None or i is None or math.isnan(self.basePositions[2 * i]):
+            return None
+        return self.basePositions[2 * i], self.basePositions[2 * i + 1]
+
+    def base_records(self):
+        #('node', id, position) graph_io records for the snapshot's nodes still in the graph, checked as each is
+        #read so the graph can be edited meanwhile; their edges are in the graph already
+        for id in self.base.ids:
+            if id not in self.removed:
+                yield ('node', id, self.position(id))
+
+    def base_neighbours(self, id):
+        #weights are mapped as float64, a snapshot of whole numbers hands them back as ints like the graph it was taken from
+        if not self.integerWeights:
+            return self.base.neighbours(id)
+        base = self.base
+        i = base.index[id]
+        start, end = base.offsets[i], base.offsets[i + 1]
+        return zip(map(base.ids.__getitem__, base.targets[start:end]), map(int, base.weights[start:end]))
+
+    def row(self, id):
+        #the editable neighbour dict of a node, copied out of the mapped arrays on first use
+        row = self.edited.get(id)
+        if row is None:
+            if id in self.removed:
+                raise KeyError(id)
+            row = self.edited[id] = dict(self.base_neighbours(id))
+        return row
+
+    def add_node(self, id):
+        if self.has_node(id):
+            return
+        self.edited[id] = {}
+        self.removed.discard(id)
+        self.nodeCount += 1
+        self.changed('add_node', id)
+
+    def drop_node(self, id):
+        row = self.row(id)
+        for neighbour in row:
+            if neighbour != id:
+                del self.row(neighbour)[id]
+        del self.edited[id]
+        if id in self.base.index:
+            self.removed.add(id)
+        self.nodeCount -= 1
+
+    def add_edge(self, node1, node2, weight):
+        self.row(node1)[node2] = weight
+        self.row(node2)[node1] = weight
+        self.changed('add_edge', node1, node2, weight)
+
+    def edit_edge(self, node1, node2, weight):
+        self.row(node1)[node2] = weight
+        self.row(node2)[node1] = weight
+        self.changed('edit_edge', node1, node2, weight)
+
+    def drop_edge(self, node1, node2):
+        self.row(node1).pop(node2, None)
+        self.row(node2).pop(node1, None)
+
+    def neighbours(self, id):
+        row = self.edited.get(id)
+        if row is not None:
+            return row.items()
+        if id in self.removed:
+            raise KeyError(id)
+        return self.base_neighbours(id)
+
+    def has_node(self, id):
+        return id in self.edited or (id in self.base.index and id not in self.removed)
+
+    def has_edge(self, node1, node2):
+        row = self.edited.get(node1)
+        if row is not None:
+            return node2 in row
+        #an edge to a node added since opening would have copied node1's row
+        return node2 in self.base.index and node2 not in self.removed and self.base.has_edge(node1, node2)
+
+    def get_weight(self, node1, node2):
+        row = self.edited.get(node1)
+        if row is not None:
+            return row.get(node2)
+        if node2 not in self.base.index or node2 in self.removed:
+            return None
+        weight = self.base.get_weight(node1, node2)
+        return int(weight) if weight is not None and self.integerWeights else weight
+
+    def node_count(self):
+        return self.nodeCount
+
+    def is_edited(self):
+        return len(self.edited) > 0 or len(self.removed) > 0
+
+    def freeze(self):
+        #unedited, the mapped arrays already are a snapshot
+        return CSR_Graph.from_graph(self) if self.is_edited() else self.base
+
+    def freeze_steps(self):
+        return CSR_Graph.from_graph_steps(self) if self.is_edited() else done(self.base)
+
+
+class Mapped_Ids:
+
+    # The ids of a Mapped_Graph: base ids not removed, then the added ones.
+    # Supports iteration, len() and in like the other graphs' node_ids().
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __iter__(self):
+        removed, edited = self.graph.removed, self.graph.edited
+        for id in self.graph.base.ids:
+            if id not in removed:
+                yield id
+        base = self.graph.base.index
+        for id in edited:
+            if id not in base:
+                yield id
+
+    def __len__(self):
+        return self.graph.node_count()
+
+    def __contains__(self, id):
+        return self.graph.has_node(id)
 
 
 # x = Graph()
@@ -62,4 +536,5 @@ class Graph:
 # x.add_edge(4, 6, 12)
 # x.add_edge(5, 6, 3)
 
-# x.dijkstra(1)
+# print(x.dijkstra(1))
+# print(x.shortest_path(1, 6))
@@ -1,4 +1,4 @@
-import UI, enum
+import pygame, time, itertools, UI, enum, spatial, graph, graph_io, pathfinding, scheduler, jobs, layout, journal, instrumentation, algorithms
 
 class Editor_States(enum.Enum):
 
@@ -12,109 +12,279 @@ class Editor_States(enum.Enum):
 class Graph_Editor:
 
     nextNodeId = 1
+    importBatch = 500 #records turned into widgets per frame while a file is loading
+    layoutSlice = 250 #nodes whose repulsion is worked out per step, one iteration on a big graph is split across frames
+    layoutBatch = 64 #nodes moved per layout step
+    snapshotBatch = 4096 #node positions copied per step for a journal snapshot
+    layoutBounds = (60, 60, 1000, 470) #inside bg, clear of the buttons; grown for big graphs
+    layoutSpacing = 90 #world space per node the layout area is grown to
+    zoomStep = 1.15
+    panStep = 100
+    thinEdgeWidth = 1 #edges drawn at most this wide are batched into one polyline per node
+    weightEditDelay = 0.8 #seconds without a keystroke before a typed weight is applied
+    hudRect = pygame.Rect(30, 620, 1140, 120) #under the status text
+    hudRows = 6
+    hudColumnWidth = 228
+    hudFontSize = 16
+    analysisKeys = (100, 97, 104, 112, 109, 99) #d, a, h, p, m, c
 
-    def __init__(self, graph):
+    def __init__(self, graph, stepScheduler=None, history=None):
         self.graph = graph
+        self.scheduler = stepScheduler if stepScheduler is not None else scheduler.Step_Scheduler()
+        self.journal = history if history is not None else journal.Journal()
+        self.journal.snapshotWriter = self.save_file
+        self.journal.snapshotStarter = self.start_snapshot
+        self.snapshotTask = None #copying the graph for a journal snapshot
+        self.snapshotChanged = set() #ids whose edges or position changed during the copy
+        self.snapshotGeneration = None #the journal generation being copied, once the copy is complete and is being frozen
+        self.snapshotJobs = jobs.Job_Runner() #snapshot writes, apart from self.jobs so clear_search() leaves them be
+        self.pendingReplay = None
+        self.pressPos = None
+        self.pathStart = None
+        self.pendingWeight = None #(edge, weight before typing, typed weight, time of last key) until committed
         self.state = Editor_States.idle
-        self.nodes = []
-        self.edges = []
+        self.nodes = {} #node -> draw order, as ordered sets so removal is O(1)
+        self.edges = {} #edge -> creation order
+        self.itemOrder = itertools.count()
+        self.drawingEdge = None
+        self.nodeById = {}
+        self.ranks = algorithms.Fenwick_Tree() #1 per live node in creation order, so a prefix sum is a node's display number
+        self.rankSlots = {} #node id -> its position in ranks
+        self.renumberFrom = None #lowest rank slot deleted since the last update, later visible labels need redrawing
+        self.nodeIndex = spatial.Spatial_Grid()
+        self.edgeIndex = spatial.Spatial_Grid()
         self.l_pressPos = (0, 0)
         self.l_wasPressed = False
         self.r_wasPressed = False
         self.targetItem = None
+        self.editTarget = None
+        self.panFrom = None
+        self.camera = UI.camera
         self.bg = UI.Box(20, 20, 1160, 550, (150, 150, 150, 255), 20)
         self.addNode_button = UI.Button(1080, 40, 80, 80, (37, 193, 22), '+', (200, 200, 200, 255), 60, self.add_node)
         self.remove_button = UI.Button(1080, 140, 80, 80, (232, 65, 65), '-', (200, 200, 200, 255), 60, self.remove_selected_item, enabled=False)
         self.edgeEditor_textBox = UI.TextBox(915, 40, 150, 80, (80, 80, 80), '', (220, 220, 220), 40)
         self.buttons = [self.addNode_button, self.remove_button]
+        self.pendingImport = None
+        self.importedNodes = {}
+        self.search = None
+        self.overlayItems = set()
+        self.jobs = jobs.Job_Runner()
+        self.layout = None
+        self.layoutNodes = []
+        self.layoutStart = []
+        self.layoutTask = None
+        self.importNeedsLayout = False
+        self.importExisting = False #importing widgets for a graph that already holds the records
+        self.statusText = UI.Text(30, 585, '', (40, 40, 40), 24)
+        self.jobMessage = ''
+        self.moveCount = 0 #bumped by every node placement and move, positions() is cached on it and the graph version
+        self.positionsCache = (None, None)
+        self.heuristicScale = (None, None) #(positions key, A* heuristic scale)
+        self.graph.add_listener(self.graph_changed)
     
     def update(self):
-        for node in self.nodes:
-            node.set_editing(False)
-        for edge in self.edges:
-            edge.set_editing(False)
-        self.remove_button.set_enabled(False)
-        self.edgeEditor_textBox.set_enabled(False)
-
-        if self.state in [Editor_States.editingEdge, Editor_States.editingNode]:
-            self.targetItem.set_editing(True)
-            self.remove_button.set_enabled(True)
+        self.jobs.drain()
+        self.snapshotJobs.drain()
+        if self.pendingImport is not None:
+            self.continue_import()
+        if self.renumberFrom is not None:
+            self.mark_renumbered()
+        editing = self.state in [Editor_States.editingEdge, Editor_States.editingNode]
+        editTarget = self.targetItem if editing else None
+        if self.pendingWeight is not None:
+            edge, _, _, lastKey = self.pendingWeight
+            if edge is not editTarget or time.perf_counter() - lastKey > self.weightEditDelay:
+                self.commit_weight()
+        if editTarget is not self.editTarget: #only the old and new target change, not worth walking every widget
+            if self.editTarget is not None:
+                self.editTarget.set_editing(False)
+            if editTarget is not None:
+                editTarget.set_editing(True)
+            self.editTarget = editTarget
+        self.remove_button.set_enabled(editing)
+        if instrumentation.instruments.refresh_hud():
+            UI.dirtyRegions.add(self.hudRect)
 
         if self.state == Editor_States.editingEdge:
             self.edgeEditor_textBox.set_enabled(True, self.targetItem)
+        else:
+            self.edgeEditor_textBox.set_enabled(False)
 
         if self.state == Editor_States.idle:
             if self.targetItem is not None:
                 self.targetItem = None
 
+    def nodes_at(self, pos):
+        instrumentation.instruments.count('hit tests')
+        hits = [node for node in self.nodeIndex.query_point(pos) if node.check_press(pos)]
+        if len(hits) > 1:
+            hits.sort(key=self.nodes.get) #keep the old first-in-draw-order priority
+        return hits
+
+    def edge_at(self, pos):
+        instrumentation.instruments.count('hit tests')
+        hits = [edge for edge in self.edgeIndex.query_point(pos) if edge.check_press(pos)]
+        if len(hits) > 1:
+            hits.sort(key=self.edges.get)
+        return hits[0] if hits else None
+
+    def colliding_node(self, pos, ignore=None):
+        instrumentation.instruments.count('hit tests')
+        for node in self.nodeIndex.query_radius(pos, 2.8 * UI.Node.size):
+            if node is not ignore and node.check_nodeCollision(pos):
+                return node
+        return None
+
+    def index_node(self, node):
+        #call after a node moves so hit-testing sees its new position
+        self.moveCount += 1
+        if self.snapshotTask is not None:
+            self.snapshotChanged.add(node.id)
+        self.nodeIndex.update(node, node.get_hitbox())
+        for edge in node.edges:
+            self.edgeIndex.update(edge, edge.get_hitbox())
+
     def l_down(self, mousePos):
-        for node in self.nodes:
-            if node.check_press(mousePos):
-                self.targetItem = node
-                self.nodes.remove(node) #move to end of list so renders on top
-                self.nodes.append(node)
-                self.state = Editor_States.selectedNode
-                return
-        for edge in self.edges:
-            if edge.check_press(mousePos):
-                self.targetItem = edge
-                self.state = Editor_States.editingEdge
-                return
-        for button in self.buttons:
+        self.stop_layout()
+        if self.edits_blocked(): #nothing to drag or type into either, every edit waits
+            self.state = Editor_States.idle
+            return
+        for button in self.buttons: #drawn over the graph, so pressed first
             if button.check_press(mousePos):
                 button.function()
+                self.state = Editor_States.idle
+                return
+        if not self.bg.pos_is_in(mousePos):
+            self.state = Editor_States.idle
+            return
+        mousePos = self.camera.to_world(mousePos)
+        for node in self.nodes_at(mousePos):
+            self.targetItem = node
+            self.pressPos = (node.pos.x, node.pos.y)
+            self.nodes[node] = next(self.itemOrder) #last in draw order, as when the list moved it to the end
+            node.mark_dirty()
+            self.state = Editor_States.selectedNode
+            return
+        edge = self.edge_at(mousePos)
+        if edge is not None:
+            self.targetItem = edge
+            self.state = Editor_States.editingEdge
+            return
         self.state = Editor_States.idle
 
     def l_up(self):
         if self.state == Editor_States.draggingNode:
             self.state = Editor_States.idle
-            self.targetItem.set_valid(True)
-            self.targetItem.move_to_last_valid()
+            node = self.targetItem
+            node.set_valid(True)
+            node.move_to_last_valid()
+            self.index_node(node)
+            if (node.pos.x, node.pos.y) != self.pressPos:
+                self.do(('move_nodes', ((node.id, self.pressPos[0], self.pressPos[1], node.pos.x, node.pos.y),)))
             
         if self.state == Editor_States.selectedNode:
             self.state = Editor_States.editingNode
     
     def r_down(self, mousePos):
-        for node in self.nodes:
-            if node.check_press(mousePos):
-                self.edges.append(UI.Drawing_Edge(node))
-                self.state = Editor_States.drawingEdge
-                return
+        if self.edits_blocked():
+            self.state = Editor_States.idle
+            return
+        mousePos = self.camera.to_world(mousePos)
+        for node in self.nodes_at(mousePos):
+            self.drawingEdge = UI.Drawing_Edge(node)
+            self.state = Editor_States.drawingEdge
+            return
         self.state = Editor_States.idle
     
     def r_up(self, mousePos):
         if self.state == Editor_States.drawingEdge:
-            edge = self.edges.pop()
-            for node in self.nodes:
-                if node.check_press(mousePos) and node != edge.node:
-                    self.add_edge(edge.node, node)
+            edge, self.drawingEdge = self.drawingEdge, None
+            UI.dirtyRegions.add(edge.get_bounds())
+            for node in self.nodes_at(self.camera.to_world(mousePos)):
+                if node != edge.node and not self.graph.has_edge(edge.node.id, node.id):
+                    self.do(('add_edge', edge.node.id, node.id, 0))
         self.state = Editor_States.idle
 
+    def m_down(self, mousePos):
+        if self.bg.pos_is_in(mousePos):
+            self.panFrom = mousePos
+
+    def m_up(self):
+        self.panFrom = None
+
+    def zoom(self, mousePos, steps):
+        if self.bg.pos_is_in(mousePos):
+            self.camera.zoom_at(mousePos, self.zoomStep ** steps)
+
     def mouse_move(self, mousePos):
+        if self.panFrom is not None:
+            self.camera.pan(mousePos[0] - self.panFrom[0], mousePos[1] - self.panFrom[1])
+            self.panFrom = mousePos
+            return
         if not self.bg.pos_is_in(mousePos):
             return
+        mousePos = self.camera.to_world(mousePos)
         if self.state == Editor_States.selectedNode:
             self.state = Editor_States.draggingNode
         if self.state == Editor_States.draggingNode:
-            for node in self.nodes:
-                if node != self.targetItem:
-                    if node.check_nodeCollision(mousePos):
-                        self.targetItem.set_valid(False)
-                        self.targetItem.set_pos(mousePos[0], mousePos[1])
-                        return
-            self.targetItem.set_valid(True)
+            self.targetItem.set_valid(self.colliding_node(mousePos, self.targetItem) is None)
             self.targetItem.set_pos(mousePos[0], mousePos[1])
+            self.index_node(self.targetItem)
         if self.state == Editor_States.drawingEdge:
-            for node in self.nodes:
-                if node.check_press(mousePos) and node != self.edges[-1].node:
-                    self.edges[-1].update(node.get_pos(), True)
+            for node in self.nodes_at(mousePos):
+                if node != self.drawingEdge.node:
+                    self.drawingEdge.update(node.get_pos(), True)
                     return
-            self.edges[-1].update(mousePos, False)
+            self.drawingEdge.update(mousePos, False)
         
     def key_down(self, key):
+        if key in self.analysisKeys and self.is_loading(): #results would name nodes that have no widget yet
+            self.statusText.set_text('still loading')
+            return
+        if key == 100 and self.state == Editor_States.editingNode: #d: animate shortest paths from the selected node
+            self.start_search(self.targetItem)
+            return
+        if key == 97 and self.state == Editor_States.editingNode: #a: same, computed in the background and shown at once
+            self.start_background_search(self.targetItem)
+            return
+        if key == 104 and self.state == Editor_States.editingNode: #h: hop counts from the selected node
+            self.show_hops(self.targetItem)
+            return
+        if key == 112 and self.state == Editor_States.editingNode: #p: A* path, pressed on the start node then on the end node
+            self.path_key(self.targetItem)
+            return
+        if key == 109 and self.state != Editor_States.editingEdge: #m: minimum spanning tree
+            self.show_spanning_tree()
+            return
+        if key == 99 and self.state != Editor_States.editingEdge: #c: connected components
+            self.show_components()
+            return
+        if key == 108 and self.state != Editor_States.editingEdge: #l: toggle automatic layout
+            if self.layout is None:
+                self.start_layout()
+            else:
+                self.stop_layout()
+            return
+        if key == 27: #escape
+            self.clear_search()
+            return
+        if key in (122, 121): #z, y: undo, redo
+            if self.state not in [Editor_States.draggingNode, Editor_States.drawingEdge]:
+                self.undo() if key == 122 else self.redo()
+            return
+        arrows = {1073741903 : (-1, 0), 1073741904 : (1, 0), 1073741905 : (0, -1), 1073741906 : (0, 1)}
+        if key in arrows: #pan, the view moves the way the arrow points
+            self.camera.pan(arrows[key][0] * self.panStep, arrows[key][1] * self.panStep)
+            return
+        if key == 1073741898: #home: back to the original view
+            self.camera.reset()
+            return
         if self.state != Editor_States.editingEdge:
             return
-        num = key - 48
+        if key in (13, 1073741912): #enter
+            self.commit_weight()
+            return
         if key == 8:
             length = self.edgeEditor_textBox.backspace()
         elif key in range(48, 58):
@@ -122,69 +292,610 @@ class Graph_Editor:
         elif key in range(1073741913, 1073741923):
             if key == 1073741922: key = 1073741912
             length = self.edgeEditor_textBox.char_input(str(key - 1073741912))
-        self.graph.edit_edge(self.targetItem.node1.id, self.targetItem.node2.id, length)
+        else:
+            return
+        #only the text box and label change while typing, the graph gets one edit when it is committed
+        edge = self.targetItem
+        if self.pendingWeight is not None and self.pendingWeight[0] is edge:
+            oldLength = self.pendingWeight[1]
+        else:
+            self.commit_weight()
+            oldLength = self.graph.get_weight(edge.node1.id, edge.node2.id)
+        self.pendingWeight = (edge, oldLength, length, time.perf_counter())
+
+    def commit_weight(self):
+        if self.pendingWeight is None:
+            return
+        edge, oldLength, length, _ = self.pendingWeight
+        self.pendingWeight = None
+        if length != oldLength and self.graph.has_edge(edge.node1.id, edge.node2.id):
+            self.do(('edit_edge', edge.node1.id, edge.node2.id, oldLength, length))
 
     def add_node(self):
         collision = True
-        pos = (600, 245)
+        pos = self.camera.to_world((600, 245))
         steps = [(0, 15), (30, 0), (0, -15), (-30, 0)]
         stepIndex = 0
         repeats = 1
         while collision:
             for _ in range(repeats):
                 pos = (pos[0] + steps[stepIndex][0], pos[1] + steps[stepIndex][1])
-                if not self.bg.pos_is_in(pos):
+                if not self.bg.pos_is_in(self.camera.to_screen(pos)):
                     return
-                collision = False
-                for node in self.nodes:
-                    if node.check_nodeCollision(pos):
-                        collision = True
+                collision = self.colliding_node(pos) is not None
                 if not collision: break
             repeats += stepIndex % 2
             stepIndex = (stepIndex + 1) % 4
 
-        self.graph.add_node(self.nextNodeId)
-        self.nodes.append(UI.Node(pos[0], pos[1], self.nextNodeId))
-        self.nextNodeId += 1
+        self.do(('add_node', self.nextNodeId, pos[0], pos[1], ()))
+
+    def place_node(self, x, y, id=None):
+        if id is None:
+            id = self.nextNodeId
+        self.graph.add_node(id)
+        slot = self.ranks.append(1)
+        self.rankSlots[id] = slot
+        node = UI.Node(x, y, id, self.ranks.prefix(slot + 1))
+        self.nodes[node] = next(self.itemOrder)
+        self.nodeById[node.id] = node
+        self.index_node(node)
+        node.mark_dirty()
+        self.nextNodeId = max(self.nextNodeId, id + 1)
+        return node
+
+    def add_edge(self, sourceNode, endNode, weight=0):
+        if self.graph.has_edge(sourceNode.id, endNode.id):
+            return None
+        self.graph.add_edge(sourceNode.id, endNode.id, weight)
+        return self.edge_widget(sourceNode, endNode, weight)
+
+    def edge_widget(self, sourceNode, endNode, weight):
+        #the widget alone, for an edge the graph already has
+        edge = UI.Static_Edge(sourceNode, endNode)
+        if weight != 0:
+            edge.set_length(str(weight))
+        self.edges[edge] = next(self.itemOrder)
+        self.edgeIndex.insert(edge, edge.get_hitbox())
+        UI.dirtyRegions.add(edge.get_bounds())
+        return edge
+
+    def do(self, op):
+        #every user edit goes through here so it can be undone and is journaled
+        if self.edits_blocked():
+            return
+        self.commit_weight() #a weight still being typed happened first
+        self.stop_layout()
+        self.apply(op)
+        self.journal.record(op)
+        self.journal.checkpoint()
+
+    def undo(self):
+        if self.edits_blocked():
+            return
+        self.commit_weight()
+        self.stop_layout()
+        self.state = Editor_States.idle
+        self.targetItem = None
+        op = self.journal.undo()
+        if op is not None:
+            self.apply(op)
+            self.journal.checkpoint()
+
+    def redo(self):
+        if self.edits_blocked():
+            return
+        self.commit_weight()
+        self.stop_layout()
+        self.state = Editor_States.idle
+        self.targetItem = None
+        op = self.journal.redo()
+        if op is not None:
+            self.apply(op)
+            self.journal.checkpoint()
+
+    def apply(self, op):
+        kind = op[0]
+        if self.snapshotTask is not None:
+            self.snapshotChanged.update(journal.node_ids(op))
+        if kind == 'add_node':
+            _, id, x, y, edges = op
+            node = self.place_node(x, y, id)
+            for other, weight in edges:
+                otherNode = self.nodeById.get(other)
+                if otherNode is None: #still loading from a snapshot, its widget will pick the edge up
+                    self.graph.add_edge(id, other, weight)
+                else:
+                    self.add_edge(node, otherNode, weight)
+        elif kind == 'remove_node':
+            self.delete_node(self.nodeById[op[1]])
+        elif kind == 'add_edge':
+            self.add_edge(self.nodeById[op[1]], self.nodeById[op[2]], op[3])
+        elif kind == 'remove_edge':
+            self.remove_edge(self.edge_between(op[1], op[2]))
+        elif kind == 'edit_edge':
+            _, id1, id2, oldWeight, weight = op
+            self.graph.edit_edge(id1, id2, weight)
+            self.edge_between(id1, id2).set_length(str(weight))
+        elif kind == 'move_nodes':
+            for id, oldX, oldY, x, y in op[1]:
+                node = self.nodeById[id]
+                node.set_pos(x, y)
+                self.index_node(node)
+        else:
+            raise ValueError(f'unknown operation {kind!r}')
+
+    def recover(self):
+        #rebuilds the last session from the journal's snapshot and log
+        snapshot, entries = self.journal.recovery()
+        self.pendingReplay = entries
+        if snapshot is not None:
+            self.import_records(graph_io.read(snapshot))
+        else:
+            self.finish_import()
+
+    def open_file(self, path):
+        self.import_records(graph_io.read(path))
+
+    def open_snapshot(self, path):
+        #the graph was opened from this snapshot (graph.Mapped_Graph) and already holds it, only widgets are built,
+        #and the file itself becomes the journal's first snapshot. New ids start past all of its ids, not just the
+        #ones with widgets so far, so editing can start before every widget is built
+        self.nextNodeId = max(self.nextNodeId, self.graph.max_id() + 1)
+        self.journal.clear()
+        self.journal.adopt_snapshot(path)
+        self.import_records(self.graph.base_records(), existing=True)
+
+    def import_records(self, records, existing=False):
+        #widgets are created a batch at a time from update(), so big files never block a frame
+        self.cancel_snapshot() #the graph is replaced without going through apply()
+        self.pendingImport = iter(records)
+        self.importedNodes = {}
+        self.importNeedsLayout = False
+        self.importExisting = existing
 
-    def add_edge(self, sourceNode, endNode):
-        for edges in self.graph.nodes[sourceNode.id]:
-            if edges[0] == endNode.id:
+    def is_loading(self):
+        return self.pendingImport is not None or self.pendingReplay is not None
+
+    def edits_blocked(self):
+        #no edits until a file has loaded and a recovered log has been replayed: an edit could take an id the
+        #file still holds, or be journaled ahead of the log it should follow. An opened snapshot is already all
+        #in the graph, so only its widgets are missing
+        return self.pendingReplay is not None or (self.pendingImport is not None and not self.importExisting)
+
+    def is_busy(self):
+        #a pending weight keeps frames coming so its idle timeout can fire
+        return self.pendingImport is not None or self.pendingWeight is not None or self.scheduler.is_busy() or self.jobs.is_busy() or self.snapshotJobs.is_busy()
+
+    def edge_between(self, id1, id2):
+        node = self.nodeById.get(id1)
+        if node is None:
+            return None
+        for edge in node.edges:
+            if edge.other_node(node).id == id2:
+                return edge
+        return None
+
+    def start_search(self, node):
+        self.clear_search()
+        self.search = self.scheduler.add(pathfinding.dijkstra_steps(self.graph, node.id), self.show_search_step, self.finish_search)
+
+    def show_search_step(self, event):
+        if event[0] == 'relax':
+            _, fromId, toId, distance = event
+            self.set_overlay(self.nodeById.get(toId), 'frontier', distance)
+            if fromId is not None:
+                self.set_overlay(self.edge_between(fromId, toId), 'relaxed')
+        elif event[0] == 'tree':
+            self.set_overlay(self.edge_between(event[1], event[2]), 'tree')
+        else:
+            _, id, distance, parentId = event
+            self.set_overlay(self.nodeById.get(id), 'settled', distance)
+            if parentId is not None:
+                self.set_overlay(self.edge_between(parentId, id), 'tree')
+
+    def set_overlay(self, item, overlay, *args):
+        if item is None:
+            return
+        item.set_overlay(overlay, *args)
+        self.overlayItems.add(item)
+
+    def finish_search(self, result):
+        self.search = None
+
+    def run_job(self, function, onResult, message):
+        #analyses run on the job thread against a snapshot; it is copied over frames first, and an edit before
+        #either is done cancels them like any search
+        self.clear_search()
+        self.statusText.set_text(message)
+        self.jobMessage = message
+        self.search = self.scheduler.add(self.graph.freeze_steps(), lambda step: None, lambda snapshot: self.submit_job(function, snapshot, onResult), checkEvery=1)
+
+    def submit_job(self, function, snapshot, onResult):
+        self.search = None
+        self.jobs.submit(function, snapshot, onResult, self.show_progress, self.show_job_error)
+
+    def show_job_error(self, error):
+        self.statusText.set_text(f'background job failed: {error!r}')
+
+    def show_progress(self, fraction):
+        self.statusText.set_text(f'{self.jobMessage} {int(100 * fraction)}%')
+
+    def start_background_search(self, node):
+        self.run_job(jobs.shortest_paths_job(node.id), self.show_background_search, 'computing shortest paths...')
+
+    def show_background_search(self, result):
+        self.statusText.set_text('')
+        distances, previous = result
+        #applying thousands of overlays is spread over frames too
+        steps = (('settle', id, distances[id], parentId) for id, parentId in previous.items() if id in self.nodeById)
+        self.search = self.scheduler.add(steps, self.show_search_step, self.finish_search)
+
+    def show_steps(self, steps, message=''):
+        #overlays for whole-graph results are applied over frames like an animated search
+        self.clear_search()
+        self.statusText.set_text(message)
+        self.search = self.scheduler.add(steps, self.show_search_step, self.finish_search)
+
+    def show_hops(self, node):
+        self.run_job(jobs.call_job(pathfinding.bfs, node.id), self.show_hops_result, 'counting hops...')
+
+    def show_hops_result(self, result):
+        hops, previous = result
+        self.show_steps((('settle', id, hops[id], parentId) for id, parentId in previous.items()), f'{len(hops)} nodes reachable')
+
+    def path_key(self, node):
+        if self.pathStart is None or self.pathStart.id not in self.nodeById or self.pathStart is node:
+            self.clear_search()
+            self.pathStart = node
+            self.statusText.set_text('select the end node and press p again')
+            return
+        start, self.pathStart = self.pathStart, None
+        #the heuristic's scale is an O(V+E) pass, worked out once per graph and layout state
+        key = self.positions_key()
+        scale = self.heuristicScale[1] if self.heuristicScale[0] == key else None
+        self.run_job(jobs.astar_job(start.id, node.id, self.positions(), scale), lambda result: self.show_path(key, result), 'searching...')
+
+    def show_path(self, key, result):
+        scale, (distance, path) = result
+        self.heuristicScale = (key, scale)
+        if len(path) == 0:
+            self.clear_search()
+            self.statusText.set_text('no path')
+            return
+        steps = []
+        travelled = 0
+        for i, id in enumerate(path):
+            parentId = path[i - 1] if i > 0 else None
+            if parentId is not None:
+                travelled += self.graph.get_weight(parentId, id)
+            steps.append(('settle', id, travelled, parentId))
+        self.show_steps(iter(steps), f'shortest path: {format(distance, "g")} over {len(path) - 1} edges')
+
+    def show_spanning_tree(self):
+        self.run_job(jobs.call_job(algorithms.kruskal), self.show_spanning_tree_result, 'finding the minimum spanning tree...')
+
+    def show_spanning_tree_result(self, result):
+        total, tree = result
+        self.show_steps((('tree', id1, id2) for id1, id2, _ in tree), f'minimum spanning tree: total weight {format(total, "g")}')
+
+    def show_components(self):
+        self.run_job(jobs.call_job(algorithms.components), self.show_components_result, 'finding components...')
+
+    def show_components_result(self, groups):
+        self.clear_search()
+        self.statusText.set_text(f'{len(groups)} connected components, largest has {len(groups[0]) if groups else 0} nodes')
+
+    def clear_search(self):
+        self.jobs.cancel_all()
+        self.statusText.set_text('')
+        if self.search is not None:
+            self.scheduler.cancel(self.search)
+            self.search = None
+        for item in self.overlayItems:
+            item.set_overlay(None)
+        self.overlayItems = set()
+
+    def start_layout(self):
+        self.stop_layout()
+        if len(self.nodes) < 2 or self.is_loading():
+            return
+        self.layoutNodes = list(self.nodes)
+        index = {node : i for i, node in enumerate(self.layoutNodes)}
+        edges = [(index[edge.node1], index[edge.node2]) for edge in self.edges]
+        positions = [(node.get_pos().x, node.get_pos().y) for node in self.layoutNodes]
+        self.layoutStart = positions
+        x, y, width, height = self.layoutBounds
+        scale = max(1, (len(self.layoutNodes) * self.layoutSpacing ** 2 / (width * height)) ** 0.5)
+        bounds = (x, y, width * scale, height * scale)
+        self.layout = layout.Force_Layout(positions, edges, bounds)
+        if not pygame.Rect(self.camera.world_rect(self.bg.rect)).contains(bounds):
+            self.camera.fit(bounds, self.bg.rect.inflate(-40, -40))
+        self.layoutTask = self.scheduler.add(self.layout_steps(), lambda step: None, self.stop_layout, checkEvery=1)
+
+    def layout_steps(self):
+        #moving widgets costs far more than the vectorised step, so they are moved in batches the scheduler can pause between
+        nodes = self.layoutNodes
+        while not self.layout.is_done():
+            yield from self.layout.iteration(self.layoutSlice)
+            positions = self.layout.pos.tolist()
+            yield
+            for start in range(0, len(nodes), self.layoutBatch):
+                for node, (x, y) in zip(nodes[start:start + self.layoutBatch], positions[start:start + self.layoutBatch]):
+                    pos = node.get_pos()
+                    if abs(pos.x - x) + abs(pos.y - y) >= 0.5:
+                        node.set_pos(x, y)
+                        self.index_node(node)
+                yield
+
+    def stop_layout(self, result=None):
+        if self.layoutTask is not None and self.scheduler.is_running(self.layoutTask):
+            self.scheduler.cancel(self.layoutTask)
+        #the whole run is one undoable move
+        moves = tuple((node.id, x, y, node.pos.x, node.pos.y) for node, (x, y) in zip(self.layoutNodes, self.layoutStart)
+                      if (node.pos.x, node.pos.y) != (x, y) and self.nodeById.get(node.id) is node)
+        if len(moves) > 0:
+            self.journal.record(('move_nodes', moves))
+            self.journal.checkpoint()
+        self.layout = None
+        self.layoutNodes = []
+        self.layoutStart = []
+        self.layoutTask = None
+
+    def graph_changed(self, event, *args):
+        #the overlay, any running job and the layout describe the graph as it was, drop them on any edit
+        if self.layout is not None:
+            self.stop_layout()
+        if self.search is not None or len(self.overlayItems) > 0 or self.jobs.is_busy():
+            self.clear_search()
+
+    def imported_node(self, fileId, pos=None):
+        node = self.importedNodes.get(fileId)
+        if node is None:
+            if pos is None:
+                self.importNeedsLayout = True
+                i = len(self.importedNodes)
+                pos = (70 + (i % 12) * 90, 70 + (i // 12) * 90)
+            #integer ids are kept when free, so journal entries and saved files keep matching them
+            id = fileId if type(fileId) == int and (self.importExisting or not self.graph.has_node(fileId)) else None
+            node = self.place_node(pos[0], pos[1], id)
+            self.importedNodes[fileId] = node
+        return node
+
+    def continue_import(self):
+        budget = self.importBatch
+        while budget > 0:
+            budget -= 1
+            record = next(self.pendingImport, None)
+            if record is None:
+                self.pendingImport = None
+                self.importedNodes = {}
+                self.finish_import()
                 return
-        self.graph.add_edge(sourceNode.id, endNode.id, 0)
-        self.edges.append(UI.Static_Edge(sourceNode, endNode))
+            if record[0] == 'node':
+                node = self.imported_node(record[1], record[2])
+                if self.importExisting:
+                    budget -= self.existing_edges(node)
+                continue
+            node1 = self.imported_node(record[1])
+            node2 = self.imported_node(record[2])
+            if node1 is node2: #self loops cannot be drawn
+                continue
+            self.add_edge(node1, node2, record[3])
+
+    def existing_edges(self, node):
+        #widgets for a snapshot node's edges to nodes that have one, as the graph has them now: edits can come
+        #in while it loads. Each edge is made once, by whichever end is built last
+        count = 0
+        for neighbour, weight in self.graph.neighbours(node.id):
+            other = self.nodeById.get(neighbour)
+            if other is not None and other is not node:
+                self.edge_widget(node, other, weight)
+                count += 1
+        return count
+
+    def finish_import(self):
+        if self.pendingReplay is not None:
+            entries, self.pendingReplay = self.pendingReplay, None
+            for kind, op in entries:
+                self.apply(self.journal.replay(kind, op))
+            return
+        if not self.importExisting: #the loaded file is the new base state: nothing before it to undo
+            self.journal.clear()
+            self.journal.snapshot()
+        if self.importNeedsLayout: #the file had no positions, spread the placeholder grid out
+            self.start_layout()
+
+    def positions_key(self):
+        return (self.graph.version, self.moveCount)
+
+    def positions(self):
+        #id -> (x, y), rebuilt only after an edit or a move; read-only, jobs hold on to it
+        key = self.positions_key()
+        if self.positionsCache[0] != key:
+            self.positionsCache = (key, {node.id : (node.pos.x, node.pos.y) for node in self.nodes})
+        return self.positionsCache[1]
+
+    def save_file(self, path):
+        graph_io.write(self.graph, path, self.positions())
+
+    def start_snapshot(self):
+        #the journal's background snapshot: the graph and positions are copied over frames, then written on
+        #the snapshot thread
+        if self.snapshotTask is not None or self.is_loading():
+            return
+        self.snapshotChanged = set()
+        self.snapshotTask = self.scheduler.add(self.snapshot_steps(), lambda step: None, self.write_snapshot, checkEvery=1)
+
+    def snapshot_steps(self):
+        #edits and moves go on while copying; apply() and index_node() note the nodes they change, and those are
+        #copied again at the end, so the copy is the graph as of the last step
+        live = self.graph
+        ids = list(live.node_ids())
+        rows = {}
+        for start in range(0, len(ids), self.snapshotBatch):
+            rows.update((id, dict(live.neighbours(id))) for id in ids[start:start + self.snapshotBatch] if live.has_node(id))
+            yield
+        nodes = list(self.nodes)
+        positions = {}
+        for start in range(0, len(nodes), self.snapshotBatch):
+            positions.update((node.id, (node.pos.x, node.pos.y)) for node in nodes[start:start + self.snapshotBatch])
+            yield
+        for id in self.snapshotChanged:
+            node = self.nodeById.get(id)
+            if live.has_node(id):
+                rows[id] = dict(live.neighbours(id))
+            else:
+                rows.pop(id, None)
+            if node is not None:
+                positions[id] = (node.pos.x, node.pos.y)
+            else:
+                positions.pop(id, None)
+        self.snapshotGeneration, path = self.journal.start_snapshot() #edits from here on are logged as building on the copy
+        #frozen here rather than on the snapshot thread: it is pure Python, and would hold the GIL against the frames
+        frozen = yield from graph.Graph.from_dict(rows).freeze_steps()
+        return frozen, path, positions
+
+    def write_snapshot(self, copy):
+        frozen, path, positions = copy
+        generation = self.snapshotGeneration
+        self.snapshotTask = None
+        self.snapshotGeneration = None
+        self.snapshotJobs.submit(jobs.call_job(graph_io.write, path, positions), frozen,
+                                 lambda result: self.journal.finish_snapshot(generation), lambda error: self.snapshot_failed(generation, error))
+
+    def cancel_snapshot(self):
+        if self.snapshotTask is not None:
+            self.scheduler.cancel(self.snapshotTask)
+            self.snapshotTask = None
+        if self.snapshotGeneration is not None:
+            self.journal.abandon_snapshot(self.snapshotGeneration)
+            self.snapshotGeneration = None
+
+    def snapshot_failed(self, generation, error):
+        self.journal.abandon_snapshot(generation)
+        self.statusText.set_text(f'journal snapshot failed: {error!r}')
 
     def remove_selected_item(self):
-        if type(self.targetItem) == UI.Node:
-            self.remove_selected_node()
+        self.commit_weight() #first, so the operation below captures the typed weight
+        item = self.targetItem
+        if type(item) == UI.Node:
+            self.do(('remove_node', item.id, item.pos.x, item.pos.y, tuple(self.graph.neighbours(item.id))))
             return
-        self.remove_edge()
+        id1, id2 = item.node1.id, item.node2.id
+        self.do(('remove_edge', id1, id2, self.graph.get_weight(id1, id2)))
     
-    def remove_selected_node(self):
-        selectedNode = self.targetItem
-        self.targetItem = None
-        for edgeNodes in list(map(lambda x : (x.node1, x.node2, x), self.edges)):
-            if selectedNode in edgeNodes:
-                self.remove_edge(edgeNodes[2])
-        num = selectedNode.displayNum
-        self.graph.remove_node(selectedNode.id)
-        self.nodes.remove(selectedNode)
-        for node in self.nodes:
-            if node.displayNum > num:
-                node.set_text(str(node.displayNum - 1))
-
-    def remove_edge(self, edge=None):
-        if edge is None:
-            edge = self.targetItem
+    def delete_node(self, selectedNode):
+        if selectedNode is self.targetItem:
+            self.targetItem = None
+            self.state = Editor_States.idle
+        selectedNode.mark_dirty()
+        self.detach_edges(selectedNode.edges)
+        self.graph.remove_node(selectedNode.id) #also drops its edges from the graph
+        del self.nodes[selectedNode]
+        del self.nodeById[selectedNode.id]
+        self.nodeIndex.remove(selectedNode)
+        #later nodes move down a number; their labels are looked up when next drawn, so only visible ones are marked, once per frame
+        slot = self.rankSlots.pop(selectedNode.id)
+        self.ranks.add(slot, -1)
+        if self.camera.show_detail():
+            self.renumberFrom = slot if self.renumberFrom is None else min(self.renumberFrom, slot)
+
+    def mark_renumbered(self):
+        slot, self.renumberFrom = self.renumberFrom, None
+        rankSlots = self.rankSlots
+        for node in self.nodeIndex.query_rect(self.view_rect()):
+            if rankSlots[node.id] > slot:
+                UI.dirtyRegions.add(node.get_bounds())
+
+    def remove_edge(self, edge):
+        if edge is self.targetItem:
+            self.targetItem = None
+            self.state = Editor_States.idle
         self.graph.remove_edge(edge.node1.id, edge.node2.id)
-        self.edges.remove(edge)
+        self.detach_edges([edge])
+
+    def detach_edges(self, edges):
+        #removes edge widgets only, the graph is left to the caller
+        for edge in list(edges):
+            self.edgeIndex.remove(edge)
+            edge.node1.edges.discard(edge)
+            edge.node2.edges.discard(edge)
+            del self.edges[edge]
+            UI.dirtyRegions.add(edge.get_bounds())
+
+    def view_rect(self, area=None):
+        #the world area on screen (or under the screen rect area), with a margin for rings and labels that reach past a hitbox
+        margin = UI.Node.size + 40 / self.camera.zoom
+        x, y, width, height = self.camera.world_rect(self.bg.rect if area is None else area)
+        return (x - margin, y - margin, width + 2 * margin, height + 2 * margin)
+
+    def visible_items(self, area=None):
+        #culled through the spatial indexes, to area when only part of the screen is redrawn
+        view = self.view_rect(area)
+        nodes = sorted(self.nodeIndex.query_rect(view), key=lambda node: node.id)
+        if self.targetItem in self.nodeIndex: #the pressed node goes on top
+            if self.targetItem in nodes:
+                nodes.remove(self.targetItem)
+            nodes.append(self.targetItem)
+        #edges come out of a set; any fixed order will do, but it must be the same for a partial redraw as for a full one
+        return nodes, sorted(self.edgeIndex.query_rect(view), key=id)
 
-    def display(self, screen):
-        self.bg.display(screen)
-        for button in self.buttons:
-            button.display(screen)
-        for edge in self.edges:
+    def display_edges(self, screen, edges):
+        if self.camera.scale_width(UI.Static_Edge.thickness) > self.thinEdgeWidth:
+            for edge in edges:
+                edge.display(screen)
+            return
+        #zoomed out: plain edges become one polyline per node, [u, v1, u, v2, ...], instead of a call per edge
+        fans = {}
+        marked = []
+        for edge in edges:
+            if edge.editing or edge.overlay is not None:
+                marked.append(edge)
+            else:
+                fans.setdefault(edge.node1, []).append(edge.node2)
+        zoom, x, y = self.camera.zoom, self.camera.x, self.camera.y #camera.to_screen inlined, this loop sees every visible edge
+        for node, others in fans.items():
+            centre = ((node.pos.x - x) * zoom, (node.pos.y - y) * zoom)
+            points = [centre]
+            for other in others:
+                points += ((other.pos.x - x) * zoom, (other.pos.y - y) * zoom), centre
+            pygame.draw.lines(screen, UI.Static_Edge.colour, False, points, self.thinEdgeWidth)
+        for edge in marked: #on top of the plain ones
             edge.display(screen)
-        for node in self.nodes:
-            node.display(screen)
-        self.edgeEditor_textBox.display(screen)
\ No newline at end of file
+
+    def display(self, screen, area=None):
+        #area limits the graph to the items that can reach into it, the rest of screen is left stale
+        with instrumentation.instruments.timer('display'):
+            self.bg.display(screen)
+            if area is not None:
+                area = area.clip(self.bg.rect)
+            nodes, edges = self.visible_items(area) if area is None or area.size != (0, 0) else ((), ())
+            screen.set_clip(self.bg.rect) #the same clip every frame, so it cannot leave seams between redrawn regions
+            self.display_edges(screen, edges)
+            if self.state == Editor_States.drawingEdge:
+                self.drawingEdge.display(screen)
+            batch = []
+            detail = self.camera.show_detail()
+            UI.Node.next_frame()
+            ranks = self.ranks
+            rankSlots = self.rankSlots
+            for node in nodes:
+                if detail:
+                    node.set_displayNum(ranks.prefix(rankSlots[node.id] + 1))
+                node.add_sprites(batch, detail)
+            screen.blits(batch, False) #one call for every node sprite and label
+            screen.set_clip(None)
+            for button in self.buttons:
+                button.display(screen)
+            self.edgeEditor_textBox.display(screen)
+            self.statusText.display(screen)
+            if instrumentation.instruments.enabled:
+                self.display_hud(screen)
+
+    def display_hud(self, screen):
+        #rendered with the font directly: through textCache the HUD would count its own text renders
+        font = UI.get_font(UI.fontPath, self.hudFontSize)
+        lineHeight = self.hudRect.height // self.hudRows
+        for i, line in enumerate(instrumentation.instruments.hudLines):
+            column, row = divmod(i, self.hudRows)
+            screen.blit(font.render(line, True, (40, 40, 40)), (self.hudRect.x + column * self.hudColumnWidth, self.hudRect.y + row * lineHeight))
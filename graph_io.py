@@ -0,0 +1,307 @@
+import array, csv, json, math, mmap, os, struct, sys
+
+# Streaming readers and writers for graphs. Readers are generators of records:
+#   ('node', id, (x, y) or None)
+#   ('edge', node1, node2, weight)
+# so files of any size can be loaded without holding them in memory, and
+# writers pull edges from the graph one at a time.
+
+binaryMagic = b'GRPH'
+binaryVersion = 1
+binaryHeader = struct.Struct('<4sHQQ')
+binaryNode = struct.Struct('<qff')
+binaryEdge = struct.Struct('<qqd')
+chunkSize = 1 << 16
+
+# Snapshots are a CSR graph laid out to be memory mapped: a header, then
+# int64 ids[n], int64 offsets[n + 1], int64 targets[m], float64 weights[m]
+# and, with snapshotPositions set, float64 positions[2n] (NaN where unknown).
+# Every array starts on an 8 byte boundary, so each one is a zero-copy
+# memoryview cast of the mapping.
+snapshotMagic = b'GSNP'
+snapshotVersion = 1
+snapshotHeader = struct.Struct('<4sHHQQ') #magic, version, flags, node count, target count
+snapshotPositions = 1
+snapshotDenseIds = 2 #ids are first, first + 1, ... so no id -> index table is needed
+snapshotIntegerWeights = 4 #every weight is a whole number, handed out as int
+
+
+def iter_edges(graph):
+    #each undirected edge once
+    done = set()
+    for id in graph.node_ids():
+        for neighbour, weight in graph.neighbours(id):
+            if neighbour not in done and (neighbour != id or id not in done):
+                yield id, neighbour, weight
+        done.add(id)
+
+
+def parse_id(text):
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def parse_weight(text):
+    weight = float(text)
+    return int(weight) if weight.is_integer() else weight
+
+
+def read_edge_list(path):
+    with open(path, newline='') as file:
+        for row in csv.reader(file):
+            if len(row) == 0 or row[0].startswith('#'):
+                continue
+            if row[0] == 'source': #header
+                continue
+            weight = parse_weight(row[2]) if len(row) > 2 else 0
+            yield ('edge', parse_id(row[0]), parse_id(row[1]), weight)
+
+
+def write_edge_list(graph, path, positions=None):
+    #an edge list has nowhere to put positions, they are ignored
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(('source', 'target', 'weight'))
+        writer.writerows(iter_edges(graph))
+
+
+def iter_json_arrays(file):
+    # Incremental reader for a top level object whose values are arrays:
+    # yields (key, item) for every array item, decoding one item at a time.
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = file.read(chunkSize)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        eof = chunk == ''
+
+    def skip(chars):
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    def decode():
+        nonlocal pos
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                if end < len(buffer) or eof: #a value cut off at the buffer edge may still look complete
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+
+    def peek():
+        #the character skip() stopped at
+        if pos >= len(buffer):
+            raise ValueError('truncated JSON graph file')
+        return buffer[pos]
+
+    def expect(char):
+        nonlocal pos
+        skip(' \t\r\n')
+        if peek() != char:
+            raise ValueError(f'expected {char!r} in JSON graph file')
+        pos += 1
+
+    fill()
+    expect('{')
+    while True:
+        skip(' \t\r\n,')
+        if pos < len(buffer) and buffer[pos] == '}':
+            return
+        key = decode()
+        expect(':')
+        skip(' \t\r\n')
+        if peek() != '[':
+            decode() #scalar metadata, not streamed
+            continue
+        pos += 1
+        while True:
+            skip(' \t\r\n,')
+            if peek() == ']':
+                pos += 1
+                break
+            yield key, decode()
+
+
+def read_json(path):
+    with open(path) as file:
+        for key, item in iter_json_arrays(file):
+            if key == 'nodes':
+                pos = (item['x'], item['y']) if 'x' in item else None
+                yield ('node', item['id'], pos)
+            elif key == 'edges':
+                yield ('edge', item[0], item[1], item[2] if len(item) > 2 else 0)
+
+
+def write_json(graph, path, positions=None):
+    #one record per line so the output streams and diffs well
+    with open(path, 'w') as file:
+        file.write('{"version": 1,\n"nodes": [')
+        separator = '\n'
+        for id in graph.node_ids():
+            record = {'id' : id}
+            if positions is not None and id in positions:
+                record['x'], record['y'] = positions[id]
+            file.write(separator + json.dumps(record))
+            separator = ',\n'
+        file.write('\n],\n"edges": [')
+        separator = '\n'
+        for edge in iter_edges(graph):
+            file.write(separator + json.dumps(edge))
+            separator = ',\n'
+        file.write('\n]}\n')
+
+
+def iter_structs(file, record, count):
+    while count > 0:
+        batch = min(count, chunkSize // record.size)
+        data = file.read(batch * record.size)
+        if len(data) != batch * record.size:
+            raise ValueError('truncated binary graph file')
+        yield from record.iter_unpack(data)
+        count -= batch
+
+
+def read_binary(path):
+    with open(path, 'rb') as file:
+        magic, version, nodeCount, edgeCount = binaryHeader.unpack(file.read(binaryHeader.size))
+        if magic != binaryMagic or version != binaryVersion:
+            raise ValueError(f'{path} is not a version {binaryVersion} binary graph file')
+        for id, x, y in iter_structs(file, binaryNode, nodeCount):
+            yield ('node', id, None if math.isnan(x) else (x, y))
+        for node1, node2, weight in iter_structs(file, binaryEdge, edgeCount):
+            yield ('edge', node1, node2, parse_weight(weight))
+
+
+def write_binary(graph, path, positions=None):
+    with open(path, 'wb') as file:
+        file.write(binaryHeader.pack(binaryMagic, binaryVersion, 0, 0))
+        nodeCount = edgeCount = 0
+        for id in graph.node_ids():
+            x, y = positions.get(id, (math.nan, math.nan)) if positions is not None else (math.nan, math.nan)
+            file.write(binaryNode.pack(id, x, y))
+            nodeCount += 1
+        for edge in iter_edges(graph):
+            file.write(binaryEdge.pack(*edge))
+            edgeCount += 1
+        file.seek(0) #counts are only known once everything has been streamed out
+        file.write(binaryHeader.pack(binaryMagic, binaryVersion, nodeCount, edgeCount))
+
+
+def write_snapshot(graph, path, positions=None):
+    #graph.freeze() gives the CSR arrays; ids have to be integers
+    snapshot = graph.freeze()
+    ids = array.array('q')
+    ids.frombytes(memoryview(as_buffer(snapshot.ids, 'q')).cast('B'))
+    weights = as_buffer(snapshot.weights, 'd')
+    n, m = len(ids), len(snapshot.targets)
+    flags = 0
+    if positions is not None:
+        flags |= snapshotPositions
+    if n > 0 and ids == array.array('q', range(ids[0], ids[0] + n)):
+        flags |= snapshotDenseIds
+    if all(map(float.is_integer, weights)):
+        flags |= snapshotIntegerWeights
+    #written beside the target and moved over it, so a mapped copy of an older version stays intact
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(snapshotHeader.pack(snapshotMagic, snapshotVersion, flags, n, m))
+        file.write(ids)
+        file.write(as_buffer(snapshot.offsets, 'q'))
+        file.write(as_buffer(snapshot.targets, 'q'))
+        file.write(weights)
+        if positions is not None:
+            coordinates = array.array('d')
+            for id in ids:
+                coordinates.extend(positions.get(id, (math.nan, math.nan)))
+            file.write(coordinates)
+    os.replace(temporary, path)
+
+
+def as_buffer(values, code):
+    #arrays and mapped views of the right type are written as they are
+    if (type(values) == array.array and values.typecode == code) or (type(values) == memoryview and values.format == code):
+        return values
+    return array.array(code, values)
+
+
+def map_snapshot(path):
+    #(flags, ids, offsets, targets, weights, positions or None) as memoryviews over a read-only mapping
+    if sys.byteorder != 'little':
+        raise ValueError('graph snapshots can only be mapped on little endian machines')
+    with open(path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size < snapshotHeader.size:
+            raise ValueError(f'{path} is not a graph snapshot')
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) #stays valid after the file is closed
+    view = memoryview(mapping)
+    magic, version, flags, n, m = snapshotHeader.unpack(view[:snapshotHeader.size])
+    if magic != snapshotMagic or version != snapshotVersion:
+        raise ValueError(f'{path} is not a version {snapshotVersion} graph snapshot')
+    lengths = [n, n + 1, m, m, 2 * n if flags & snapshotPositions else 0]
+    if size != snapshotHeader.size + 8 * sum(lengths):
+        raise ValueError(f'{path} is truncated')
+    arrays = []
+    start = snapshotHeader.size
+    for length, code in zip(lengths, 'qqqdd'):
+        arrays.append(view[start:start + 8 * length].cast(code))
+        start += 8 * length
+    ids, offsets, targets, weights, positions = arrays
+    return flags, ids, offsets, targets, weights, positions if flags & snapshotPositions else None
+
+
+def read_snapshot(path):
+    flags, ids, offsets, targets, weights, positions = map_snapshot(path)
+    for i, id in enumerate(ids):
+        pos = None if positions is None or math.isnan(positions[2 * i]) else (positions[2 * i], positions[2 * i + 1])
+        yield ('node', id, pos)
+    for i, id in enumerate(ids):
+        for k in range(offsets[i], offsets[i + 1]):
+            if targets[k] >= i: #each undirected edge once
+                yield ('edge', id, ids[targets[k]], parse_weight(weights[k]))
+
+
+readers = {'.csv' : read_edge_list, '.json' : read_json, '.bin' : read_binary, '.gsnap' : read_snapshot}
+writers = {'.csv' : write_edge_list, '.json' : write_json, '.bin' : write_binary, '.gsnap' : write_snapshot}
+
+
+def read(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in readers:
+        raise ValueError(f'unsupported graph file type {extension!r}')
+    return readers[extension](path)
+
+
+def write(graph, path, positions=None):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in writers:
+        raise ValueError(f'unsupported graph file type {extension!r}')
+    return writers[extension](graph, path, positions)
+
+
+def load(graph, records):
+    #applies records straight to a graph, creating nodes that are only named by edges
+    for record in records:
+        if record[0] == 'node':
+            graph.add_node(record[1])
+        else:
+            for id in record[1:3]:
+                if not graph.has_node(id):
+                    graph.add_node(id)
+            graph.add_edge(record[1], record[2], record[3])
+    return graph
@@ -0,0 +1,152 @@
+import cProfile, collections, csv, io, json, pstats, time
+
+# Frame timers and counters for the running editor. Code under test wraps
+# itself in `with instruments.timer(name):` and calls instruments.count(name);
+# while disabled the timer is a shared object that does nothing and count()
+# returns at once, so the hooks can stay in hot paths.
+
+
+class Null_Timer:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+
+class Timer:
+
+    __slots__ = ('instruments', 'name', 'start')
+
+    def __init__(self, instruments, name):
+        self.instruments = instruments
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.instruments.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Instruments:
+
+    # Each frame's timings and counts become one record in a rolling history.
+    # With a logPath the history is rewritten there every logEvery frames, as
+    # CSV or JSON by extension, so the file always holds the latest frames.
+
+    historySize = 600
+    logEvery = 120
+    hudFrames = 60 #frames averaged for the HUD
+    hudRefresh = 0.25 #seconds between HUD updates, so the HUD alone does not keep the loop redrawing
+
+    def __init__(self):
+        self.enabled = False
+        self.times = {}
+        self.counts = {}
+        self.history = collections.deque(maxlen=self.historySize)
+        self.logPath = None
+        self.framesSinceLog = 0
+        self.frameStart = time.perf_counter()
+        self.nullTimer = Null_Timer()
+        self.profiler = None
+        self.hudLines = []
+        self.hudTime = 0
+
+    def enable(self, enabled, logPath=None):
+        if not enabled and self.enabled and self.logPath is not None:
+            self.write_log()
+        self.enabled = enabled
+        self.logPath = logPath if enabled else None
+        self.times = {}
+        self.counts = {}
+        self.history.clear()
+        self.hudLines = []
+        self.hudTime = 0
+        self.frameStart = time.perf_counter()
+
+    def timer(self, name):
+        return Timer(self, name) if self.enabled else self.nullTimer
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def add_time(self, name, seconds):
+        self.times[name] = self.times.get(name, 0) + seconds
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        record = {'interval ms' : (now - self.frameStart) * 1000} #includes time spent waiting for events
+        for name, seconds in self.times.items():
+            record[name + ' ms'] = seconds * 1000
+        record.update(self.counts)
+        self.history.append(record)
+        self.times = {}
+        self.counts = {}
+        self.frameStart = now
+        if self.logPath is not None:
+            self.framesSinceLog += 1
+            if self.framesSinceLog >= self.logEvery:
+                self.write_log()
+
+    def summary(self, frames):
+        #mean of each field over the last frames, timers first
+        records = list(self.history)[-frames:]
+        if len(records) == 0:
+            return []
+        totals = {}
+        for record in records:
+            for name, value in record.items():
+                totals[name] = totals.get(name, 0) + value
+        names = sorted(totals, key=lambda name: (not name.endswith(' ms'), name))
+        return [f'{name} {totals[name] / len(records):.2f}' for name in names]
+
+    def refresh_hud(self):
+        #True when the HUD text changed and has to be redrawn
+        now = time.perf_counter()
+        if not self.enabled or now - self.hudTime < self.hudRefresh:
+            return False
+        self.hudTime = now
+        lines = self.summary(self.hudFrames)
+        changed = lines != self.hudLines
+        self.hudLines = lines
+        return changed
+
+    def write_log(self, path=None):
+        path = path if path is not None else self.logPath
+        self.framesSinceLog = 0
+        records = list(self.history)
+        with open(path, 'w', newline='') as file:
+            if path.endswith('.json'):
+                json.dump(records, file)
+                return
+            fields = []
+            for record in records:
+                fields += [name for name in record if name not in fields]
+            writer = csv.DictWriter(file, fields, restval=0)
+            writer.writeheader()
+            writer.writerows(records)
+
+    def toggle_profile(self, path):
+        #starts cProfile, or stops it, saves the stats to path and returns the top functions as text
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            return None
+        self.profiler.disable()
+        self.profiler.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(self.profiler, stream=text).sort_stats('cumulative').print_stats(15)
+        self.profiler = None
+        return text.getvalue()
+
+    def is_profiling(self):
+        return self.profiler is not None
+
+instruments = Instruments()
@@ -0,0 +1,131 @@
+import queue, threading
+import pathfinding
+
+# Background jobs for graph algorithms. Jobs run on a worker thread against an
+# immutable snapshot (graph.freeze()), so the editor can keep mutating its own
+# graph. Progress and results come back through a queue that the frame loop
+# drains, so callbacks always run on the main thread.
+
+
+class Job_Cancelled(Exception):
+    pass
+
+
+class Job:
+
+    def __init__(self, function, snapshot, onResult, onProgress, onError, results):
+        self.function = function
+        self.snapshot = snapshot
+        self.onResult = onResult
+        self.onProgress = onProgress
+        self.onError = onError
+        self.results = results
+        self.cancelEvent = threading.Event()
+
+    def cancel(self):
+        self.cancelEvent.set()
+
+    def is_cancelled(self):
+        return self.cancelEvent.is_set()
+
+    def check(self):
+        #called by job functions at convenient points
+        if self.cancelEvent.is_set():
+            raise Job_Cancelled()
+
+    def report(self, progress):
+        self.results.put(('progress', self, progress))
+
+
+class Job_Runner:
+
+    def __init__(self):
+        self.pending = queue.Queue()
+        self.results = queue.Queue()
+        self.jobs = []
+        self.thread = None
+
+    def submit(self, function, snapshot, onResult, onProgress=None, onError=None):
+        #onError(exception) gets a job's failure on the main thread; without one it is printed, never raised into the frame loop
+        job = Job(function, snapshot, onResult, onProgress, onError, self.results)
+        self.jobs.append(job)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.work, daemon=True)
+            self.thread.start()
+        self.pending.put(job)
+        return job
+
+    def work(self):
+        while True:
+            job = self.pending.get()
+            if job.is_cancelled():
+                self.results.put(('cancelled', job, None))
+                continue
+            try:
+                result = job.function(job.snapshot, job)
+                self.results.put(('result', job, result))
+            except Job_Cancelled:
+                self.results.put(('cancelled', job, None))
+            except Exception as error:
+                self.results.put(('error', job, error))
+
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def is_busy(self):
+        return len(self.jobs) > 0
+
+    def drain(self):
+        while True:
+            try:
+                kind, job, value = self.results.get_nowait()
+            except queue.Empty:
+                return
+            if kind == 'progress':
+                if not job.is_cancelled() and job.onProgress is not None:
+                    job.onProgress(value)
+                continue
+            self.jobs.remove(job)
+            if job.is_cancelled():
+                continue
+            if kind == 'result':
+                job.onResult(value)
+            elif kind == 'error':
+                if job.onError is not None:
+                    job.onError(value)
+                else:
+                    print('background job failed:', repr(value))
+
+
+def shortest_paths_job(source, reportEvery=2048):
+    def run(snapshot, job):
+        steps = pathfinding.dijkstra_steps(snapshot, source)
+        total = max(1, snapshot.node_count())
+        settled = 0
+        while True:
+            try:
+                event = next(steps)
+            except StopIteration as stop:
+                return stop.value
+            if event[0] == 'settle':
+                settled += 1
+                if settled % reportEvery == 0:
+                    job.check()
+                    job.report(settled / total)
+    return run
+
+
+def call_job(function, *args):
+    #function(snapshot, *args) as a job, for algorithms without progress reports
+    def run(snapshot, job):
+        return function(snapshot, *args)
+    return run
+
+
+def astar_job(start, end, positions, scale=None):
+    #returns (scale, (distance, path)); the scale is worked out here when not given, so the caller can keep it
+    def run(snapshot, job):
+        heuristicScale = scale if scale is not None else pathfinding.heuristic_scale(snapshot, positions)
+        return heuristicScale, pathfinding.astar(snapshot, start, end, pathfinding.euclidean(positions, end, heuristicScale))
+    return run
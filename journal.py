@@ -0,0 +1,247 @@
+import glob, json, os, shutil
+
+# Editor history. Every edit is one small operation tuple:
+#   ('add_node', id, x, y, ((neighbour, weight), ...))
+#   ('remove_node', id, x, y, ((neighbour, weight), ...))
+#   ('add_edge', node1, node2, weight)
+#   ('remove_edge', node1, node2, weight)
+#   ('edit_edge', node1, node2, oldWeight, newWeight)
+#   ('move_nodes', ((id, oldX, oldY, newX, newY), ...))
+# each carrying enough to build its inverse, so undo and redo are a pop and
+# a push. The editor applies operations; this module only keeps them.
+
+
+def inverse(op):
+    kind = op[0]
+    if kind == 'add_node':
+        return ('remove_node',) + op[1:]
+    if kind == 'remove_node':
+        return ('add_node',) + op[1:]
+    if kind == 'add_edge':
+        return ('remove_edge',) + op[1:]
+    if kind == 'remove_edge':
+        return ('add_edge',) + op[1:]
+    if kind == 'edit_edge':
+        return ('edit_edge', op[1], op[2], op[4], op[3])
+    if kind == 'move_nodes':
+        return ('move_nodes', tuple((id, newX, newY, oldX, oldY) for id, oldX, oldY, newX, newY in op[1]))
+    raise ValueError(f'unknown operation {kind!r}')
+
+
+def node_ids(op):
+    #the nodes whose edges or position op changes
+    kind = op[0]
+    if kind == 'add_node' or kind == 'remove_node':
+        return (op[1],) + tuple(neighbour for neighbour, _ in op[4])
+    if kind == 'move_nodes':
+        return tuple(move[0] for move in op[1])
+    return op[1:3]
+
+
+def line_generation(line):
+    try:
+        return json.loads(line)[0]
+    except ValueError: #cut off by a crash
+        return -1
+
+
+def as_tuples(value):
+    #json gives lists back, operations are compared and stored as tuples
+    if isinstance(value, list):
+        return tuple(as_tuples(item) for item in value)
+    return value
+
+
+class Journal:
+
+    # Undo and redo stacks, optionally mirrored to disk. With a path, every
+    # do/undo/redo is appended to it as a JSON line tagged with the snapshot
+    # generation it builds on. Every snapshotEvery lines the whole graph is
+    # written to path.<generation>.gsnap (a graph_io snapshot, so recovery
+    # maps it instead of parsing it) and the log is cut down to the lines
+    # after it, so recovery replays a bounded number of lines. The write can
+    # run in the background: lines logged meanwhile already carry the new
+    # generation, and recovery replays every line from the newest complete
+    # snapshot's generation on. A new snapshot is complete before the old one
+    # is removed, so a crash at any point leaves a consistent snapshot and log.
+
+    snapshotEvery = 500
+    snapshotExtension = '.gsnap' #picks the graph_io format the snapshotWriter uses
+
+    def __init__(self, path=None):
+        self.path = path
+        self.undoStack = []
+        self.redoStack = []
+        self.generation = 0
+        self.sinceSnapshot = 0
+        self.file = None
+        self.snapshotWriter = None #set by the editor, writes the current graph to the path given
+        self.snapshotStarter = None #set by the editor to snapshot in the background, see start_snapshot()
+        self.snapshotting = False
+
+    def can_undo(self):
+        return len(self.undoStack) > 0
+
+    def can_redo(self):
+        return len(self.redoStack) > 0
+
+    def record(self, op):
+        self.undoStack.append(op)
+        self.redoStack = []
+        self.append('do', op)
+
+    def undo(self):
+        #returns the operation to apply, or None
+        if len(self.undoStack) == 0:
+            return None
+        op = self.undoStack.pop()
+        self.redoStack.append(op)
+        self.append('undo', op)
+        return inverse(op)
+
+    def redo(self):
+        if len(self.redoStack) == 0:
+            return None
+        op = self.redoStack.pop()
+        self.undoStack.append(op)
+        self.append('redo', op)
+        return op
+
+    def clear(self):
+        self.undoStack = []
+        self.redoStack = []
+
+    def append(self, kind, op):
+        if self.path is None:
+            return
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        self.file.write(json.dumps([self.generation, kind, op]) + '\n')
+        self.file.flush()
+        self.sinceSnapshot += 1
+
+    def checkpoint(self):
+        #called once the logged operations have been applied, so a snapshot includes them
+        if self.sinceSnapshot >= self.snapshotEvery and not self.snapshotting:
+            if self.snapshotStarter is not None:
+                self.snapshotStarter()
+            else:
+                self.snapshot()
+
+    def snapshot_path(self, generation):
+        return f'{self.path}.{generation}{self.snapshotExtension}'
+
+    def temporary_path(self, generation):
+        return f'{self.path}.{generation}.tmp{self.snapshotExtension}'
+
+    def snapshot(self):
+        if self.path is None or self.snapshotWriter is None:
+            return
+        generation, temporary = self.start_snapshot()
+        try:
+            self.snapshotWriter(temporary)
+        except Exception:
+            self.abandon_snapshot(generation)
+            raise
+        self.finish_snapshot(generation)
+
+    def start_snapshot(self):
+        #the graph as of now is to be written to the returned path; lines from here on build on it.
+        #Call finish_snapshot() once it is written, or abandon_snapshot()
+        self.generation += 1
+        self.sinceSnapshot = 0
+        self.snapshotting = True
+        return self.generation, self.temporary_path(self.generation)
+
+    def finish_snapshot(self, generation):
+        os.replace(self.temporary_path(generation), self.snapshot_path(generation))
+        for older, path in self.snapshots().items():
+            if older < generation:
+                os.remove(path)
+        #only the lines logged while it was written are still needed
+        if self.file is not None:
+            self.file.close()
+        kept = []
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                kept = [line for line in file if line_generation(line) >= generation]
+        with open(self.path + '.tmp', 'w') as file:
+            file.writelines(kept)
+        os.replace(self.path + '.tmp', self.path)
+        self.file = open(self.path, 'a')
+        self.snapshotting = False
+
+    def abandon_snapshot(self, generation):
+        #the newer lines still replay from the previous snapshot, the next checkpoint tries again
+        if os.path.exists(self.temporary_path(generation)):
+            os.remove(self.temporary_path(generation))
+        self.sinceSnapshot = self.snapshotEvery
+        self.snapshotting = False
+
+    def adopt_snapshot(self, path):
+        #an opened snapshot file becomes the next generation as it is, hard linked where the file system allows
+        if self.path is None:
+            return
+        generation, temporary = self.start_snapshot()
+        try:
+            os.link(path, temporary)
+        except OSError:
+            shutil.copyfile(path, temporary)
+        self.finish_snapshot(generation)
+
+    def snapshots(self):
+        found = {}
+        for path in glob.glob(glob.escape(self.path) + '.*' + self.snapshotExtension):
+            generation = path[len(self.path) + 1:-len(self.snapshotExtension)]
+            if generation.isdigit():
+                found[int(generation)] = path
+        return found
+
+    def has_recovery(self):
+        return self.path is not None and (os.path.exists(self.path) or len(self.snapshots()) > 0)
+
+    def recovery(self):
+        #the newest snapshot (None for an empty graph) and the log lines that build on it
+        snapshots = self.snapshots()
+        newest = max(snapshots, default=0)
+        self.generation = newest
+        entries = []
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                for line in file:
+                    try:
+                        generation, kind, op = json.loads(line)
+                    except ValueError: #a line cut off by the crash
+                        break
+                    if generation >= newest: #newer generations are snapshots that never finished
+                        entries.append((kind, as_tuples(op)))
+                        self.generation = max(self.generation, generation)
+        self.sinceSnapshot = len(entries)
+        return snapshots.get(newest), entries
+
+    def replay(self, kind, op):
+        #redoes a logged entry on the stacks without logging it again, returns the operation to apply
+        if kind == 'do':
+            self.undoStack.append(op)
+            self.redoStack = []
+            return op
+        if kind == 'undo':
+            if len(self.undoStack) > 0 and self.undoStack[-1] == op:
+                self.redoStack.append(self.undoStack.pop())
+            return inverse(op) #undone past the snapshot: nothing left on the stack to move
+        if len(self.redoStack) > 0 and self.redoStack[-1] == op:
+            self.redoStack.pop()
+        self.undoStack.append(op)
+        return op
+
+    def discard(self):
+        #clean exit: nothing to recover
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.path is None:
+            return
+        temporaries = glob.glob(glob.escape(self.path) + '.*.tmp' + self.snapshotExtension)
+        for path in list(self.snapshots().values()) + temporaries + [self.path]:
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,139 @@
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class Force_Layout:
+
+    # Fruchterman-Reingold force directed layout over all node positions at
+    # once. Repulsion is exact for small graphs; above exactLimit nodes each
+    # node is pushed by the centroids of a coarse grid of cells instead, which
+    # turns the O(N^2) pair sum into O(N * cells). step() runs whole
+    # iterations; iteration() pauses between node slices, so the editor can
+    # spread even one iteration over frames.
+
+    exactLimit = 400
+    chunkPairs = 1 << 21 #pair interactions per numpy batch, bounds temporary memory
+    cooling = 0.95
+    minTemperature = 0.5
+
+    def __init__(self, positions, edges, bounds, temperature=None):
+        if numpy is None:
+            raise ImportError('numpy is required for Force_Layout')
+        self.pos = numpy.array(positions, dtype=numpy.float64).reshape(-1, 2)
+        self.edges = numpy.array(edges, dtype=numpy.int64).reshape(-1, 2)
+        self.bounds = bounds
+        x, y, width, height = bounds
+        self.k = math.sqrt(width * height / max(1, len(self.pos))) #ideal edge length
+        self.temperature = temperature if temperature is not None else width / 10
+        rng = numpy.random.default_rng(0)
+        self.pos += rng.uniform(-0.5, 0.5, self.pos.shape) #separates nodes that start on top of each other
+
+    def is_done(self):
+        return self.temperature < self.minTemperature
+
+    def step(self, iterations=1):
+        for _ in range(iterations):
+            if self.is_done():
+                break
+            for _ in self.iteration():
+                pass
+        return self.pos
+
+    def iteration(self, sliceNodes=None):
+        #one iteration as a generator, yielding after the repulsion on each sliceNodes nodes so a caller can spread it over frames
+        count = len(self.pos)
+        sliceNodes = sliceNodes or max(1, count)
+        displacement = self.attraction()
+        field = self.repulsion_field()
+        for start in range(0, count, sliceNodes):
+            displacement[start:start + sliceNodes] += self.repulsion_rows(field, start, min(count, start + sliceNodes))
+            if start + sliceNodes < count:
+                yield
+        length = numpy.maximum(numpy.hypot(displacement[:, 0], displacement[:, 1]), 1e-9)
+        self.pos += displacement * (numpy.minimum(length, self.temperature) / length)[:, None]
+        x, y, width, height = self.bounds
+        numpy.clip(self.pos[:, 0], x, x + width, out=self.pos[:, 0])
+        numpy.clip(self.pos[:, 1], y, y + height, out=self.pos[:, 1])
+        self.temperature *= self.cooling
+
+    def attraction(self):
+        count = len(self.pos)
+        if len(self.edges) == 0:
+            return numpy.zeros((count, 2))
+        source, target = self.edges[:, 0], self.edges[:, 1]
+        delta = self.pos[source] - self.pos[target]
+        force = delta * (numpy.hypot(delta[:, 0], delta[:, 1]) / self.k)[:, None] #d^2 / k along the edge
+        result = numpy.empty((count, 2))
+        for axis in (0, 1):
+            result[:, axis] = numpy.bincount(target, force[:, axis], count) - numpy.bincount(source, force[:, axis], count)
+        return result
+
+    def push(self, points, sources, mass):
+        #k^2 / d repulsion on points from each source, weighted by mass; x and y kept as 2D arrays, cheaper than one 3D array
+        dx = points[:, 0, None] - sources[None, :, 0]
+        dy = points[:, 1, None] - sources[None, :, 1]
+        scale = (mass * self.k ** 2) / numpy.maximum(dx * dx + dy * dy, 1e-2)
+        return numpy.stack([(dx * scale).sum(axis=1), (dy * scale).sum(axis=1)], axis=1)
+
+    def repulsion(self):
+        return self.repulsion_rows(self.repulsion_field(), 0, len(self.pos))
+
+    def repulsion_field(self):
+        #what every node is pushed by: None for the exact pair sum, else the grid's cell of each node, its counts, sums and centroids
+        count = len(self.pos)
+        if count <= self.exactLimit:
+            return None
+        x, y, width, height = self.bounds
+        cells = max(2, math.ceil(2 * count ** 0.25))
+        cx = numpy.clip(((self.pos[:, 0] - x) / width * cells).astype(numpy.int64), 0, cells - 1)
+        cy = numpy.clip(((self.pos[:, 1] - y) / height * cells).astype(numpy.int64), 0, cells - 1)
+        cell = cx * cells + cy
+        counts = numpy.bincount(cell, minlength=cells * cells).astype(numpy.float64)
+        sums = numpy.stack([numpy.bincount(cell, self.pos[:, axis], cells * cells) for axis in (0, 1)], axis=1)
+        occupied = numpy.nonzero(counts)[0]
+        return cell, counts, sums, sums[occupied] / counts[occupied][:, None], counts[occupied]
+
+    def repulsion_rows(self, field, start, stop):
+        #repulsion on nodes start to stop
+        if field is None:
+            return self.exact_repulsion(start, stop)
+        cell, counts, sums, centroids, mass = field
+        pos = self.pos[start:stop]
+        cell = cell[start:stop]
+        result = numpy.empty((len(pos), 2))
+        rows = max(1, self.chunkPairs // len(centroids))
+        for first in range(0, len(pos), rows):
+            result[first:first + rows] = self.push(pos[first:first + rows], centroids, mass)
+
+        #own cell: swap its centroid term for one that leaves the node itself out
+        ownCount = counts[cell]
+        ownCentroid = sums[cell] / ownCount[:, None]
+        result -= self.pair_push(pos, ownCentroid, ownCount)
+        others = ownCount > 1
+        adjusted = (sums[cell][others] - pos[others]) / (ownCount[others] - 1)[:, None]
+        result[others] += self.pair_push(pos[others], adjusted, ownCount[others] - 1)
+        return result
+
+    def pair_push(self, points, sources, mass):
+        delta = points - sources
+        distance2 = numpy.maximum((delta ** 2).sum(axis=1), 1e-2)
+        return delta * (mass * self.k ** 2 / distance2)[:, None]
+
+    def exact_repulsion(self, first=0, stop=None):
+        count = len(self.pos)
+        stop = count if stop is None else stop
+        result = numpy.empty((stop - first, 2))
+        rows = max(1, self.chunkPairs // max(1, count))
+        for start in range(first, stop, rows):
+            chunk = self.pos[start:min(stop, start + rows)]
+            dx = chunk[:, 0, None] - self.pos[None, :, 0]
+            dy = chunk[:, 1, None] - self.pos[None, :, 1]
+            distance2 = numpy.maximum(dx * dx + dy * dy, 1e-2)
+            distance2[numpy.arange(len(chunk)), numpy.arange(start, start + len(chunk))] = numpy.inf #no self force
+            scale = self.k ** 2 / distance2
+            result[start - first:start - first + len(chunk), 0] = (dx * scale).sum(axis=1)
+            result[start - first:start - first + len(chunk), 1] = (dy * scale).sum(axis=1)
+        return result
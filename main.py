@@ -1,5 +1,5 @@
 import pygame as pg
-import app
+import app, sys
 
 
 # Click '+' to add node
@@ -7,8 +7,18 @@ import app
 # Right click and drag on node to draw edge
 # Click on edge/node to select
 # Press '-' when selected to delete
-# Type when edge selected to edit length
+# Type when edge selected to edit length, it is applied on enter, on selecting something else or after a pause
 # Press enter to print graph representation (nodes are represented by id so might not match the numbers on the UI nodes)
+# Press 'd' when a node is selected to animate shortest paths from it, escape to clear
+# Press 'a' when a node is selected to compute them in the background instead
+# Press 'h' when a node is selected for hop counts, 'p' on one node then another for the A* path between them
+# Press 'm' to show the minimum spanning tree, 'c' to count connected components
+# Press 'l' to start/stop automatic layout
+# Press 'z' to undo, 'y' to redo; after a crash the next run recovers the session from graph.journal
+# Scroll to zoom, middle click and drag or use the arrow keys to pan, home to reset the view
+# Press 's' to save the graph to graph.json
+# Press F3 to show frame timings and counters (also logged to perf_log.csv, F4 writes it now), F12 to start/stop cProfile
+# Run 'python main.py <file>' to open a .csv edge list, .json, .bin or .gsnap graph file (.gsnap files are memory mapped)
 
 
 pg.init()
@@ -16,37 +26,35 @@ displaySize = (1200, 750)
 BG = pg.display.set_mode(displaySize)
 DISPLAY = pg.Surface(displaySize, pg.SRCALPHA)
 clock = pg.time.Clock()
+retainedMode = True #only redraw what changed, and sleep until the next event when nothing has
 
-appObj = app.App()
+appObj = app.App(sys.argv[1] if len(sys.argv) > 1 else None, journalPath='graph.journal')
 
 
 run = True
 while run:
 
-    for event in pg.event.get():
+    events = pg.event.get()
+    if retainedMode and len(events) == 0 and not appObj.needs_redraw() and not appObj.is_busy():
+        events = [pg.event.wait()]
+
+    for event in events:
         if event.type == pg.QUIT:
             run = False
 
-        if event.type == pg.MOUSEBUTTONDOWN:
-            appObj.mouse_down(event.pos, event.__dict__['button'])
-
-        if event.type == pg.MOUSEBUTTONUP:
-            appObj.mouse_up(event.pos, event.__dict__['button'])
-
-        if event.type == pg.MOUSEMOTION:
-            appObj.mouse_move(event.pos)
-
-        if event.type == pg.KEYDOWN:
-            appObj.key_down(event.key)
-            
+        appObj.handle_event(event)
 
     appObj.update()
 
-    BG.fill((130, 130, 130, 0))
-    DISPLAY.fill((130, 130, 130, 0))
-    appObj.display(DISPLAY)
-    BG.blit(DISPLAY, (0, 0))
-    pg.display.flip()
+    if not retainedMode:
+        appObj.invalidate()
+    rects = appObj.render(BG, DISPLAY)
+    if rects is None:
+        pg.display.flip()
+    elif len(rects) > 0:
+        pg.display.update(rects)
     clock.tick(144)
 
     
+
+appObj.close()
@@ -0,0 +1,426 @@
+import array, collections, concurrent.futures, heapq, math, os
+import graph_io
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Shortest path engine. Works on anything with a neighbours(id) method that
+# yields (neighbour, weight) pairs, so every graph backend can share it.
+
+
+def best_first(graph, start, end=None, estimate=None, additive=True):
+    # Priority-first traversal shared by Dijkstra, A* and Prim. Every node
+    # reached gets a label:
+    #   additive   label = parent's label + edge weight (path length)
+    #   otherwise  label = edge weight (cheapest edge into the tree, Prim)
+    # and the heap is ordered by label, plus estimate(node) when given (A*;
+    # it must never overestimate the distance left to end). Returns
+    # (labels, previous), cut down to the settled nodes when stopping at end.
+    steps = best_first_steps(graph, start, end, estimate, additive, False)
+    try:
+        next(steps)
+    except StopIteration as stop:
+        return stop.value
+
+
+def best_first_steps(graph, start, end=None, estimate=None, additive=True, events=True):
+    #best_first() as a generator; with events it yields the ('relax', ...) and ('settle', ...) steps listed
+    #under dijkstra_steps(), without them it runs to the end on the first next()
+    labels = {start : 0}
+    previous = {start : None}
+    settled = set()
+    heap = [(0 if estimate is None else estimate(start), start)]
+    neighbours = graph.neighbours
+    push, pop = heapq.heappush, heapq.heappop
+    if events:
+        yield ('relax', None, start, 0)
+
+    while heap:
+        node = pop(heap)[1]
+        if node in settled: #stale entry left behind by a later decrease (lazy deletion)
+            continue
+        settled.add(node)
+        if events:
+            yield ('settle', node, labels[node], previous[node])
+        if node == end:
+            break
+        base = labels[node] if additive else 0
+        for neighbour, weight in neighbours(node):
+            if neighbour in settled:
+                continue
+            label = base + weight
+            if label < labels.get(neighbour, math.inf):
+                labels[neighbour] = label
+                previous[neighbour] = node
+                push(heap, (label if estimate is None else label + estimate(neighbour), neighbour))
+                if events:
+                    yield ('relax', node, neighbour, label)
+
+    if end is not None: #only the settled part of the tree is final after an early exit
+        labels = {node : labels[node] for node in settled}
+        previous = {node : previous[node] for node in settled}
+    return labels, previous
+
+
+def dijkstra(graph, start, end=None):
+    return best_first(graph, start, end)
+
+
+def astar(graph, start, end, estimate):
+    #returns (distance, path) like shortest_path()
+    distances, previous = best_first(graph, start, end, estimate)
+    if end not in distances:
+        return math.inf, []
+    return distances[end], reconstruct_path(previous, end)
+
+
+def heuristic_scale(graph, positions):
+    # Largest s with s * straight line distance <= weight over every edge, so
+    # s * distance to the goal never overestimates and A* stays exact even
+    # though weights are typed in rather than measured. 0 (no guidance) if
+    # some edge is free.
+    scale = math.inf
+    for id in graph.node_ids():
+        x, y = positions[id]
+        for neighbour, weight in graph.neighbours(id):
+            nx, ny = positions[neighbour]
+            length = math.hypot(nx - x, ny - y)
+            if length > 0 and weight < scale * length:
+                scale = weight / length
+    return 0 if scale == math.inf else max(0, scale)
+
+
+def euclidean(positions, end, scale=1):
+    ex, ey = positions[end]
+    def estimate(node):
+        x, y = positions[node]
+        return scale * math.hypot(ex - x, ey - y)
+    return estimate
+
+
+def bfs(graph, start, end=None):
+    #fewest edges rather than least weight, so a FIFO queue does what the heap would: returns (hops, previous)
+    hops = {start : 0}
+    previous = {start : None}
+    queue = collections.deque([start])
+    neighbours = graph.neighbours
+    while queue:
+        node = queue.popleft()
+        if node == end:
+            break
+        depth = hops[node] + 1
+        for neighbour, _ in neighbours(node):
+            if neighbour not in hops:
+                hops[neighbour] = depth
+                previous[neighbour] = node
+                queue.append(neighbour)
+    return hops, previous
+
+
+def dijkstra_steps(graph, start, end=None):
+    # Resumable Dijkstra for visualisation. Yields
+    #   ('relax', node, neighbour, distance)  an edge improved neighbour, which joined the frontier
+    #   ('settle', node, distance, parent)    node's distance is final
+    # and returns (distances, previous) like dijkstra().
+    return (yield from best_first_steps(graph, start, end))
+
+
+def reconstruct_path(previous, end):
+    if end not in previous:
+        return []
+    path = []
+    node = end
+    while node is not None:
+        path.append(node)
+        node = previous[node]
+    path.reverse()
+    return path
+
+
+def shortest_path(graph, start, end):
+    distances, previous = dijkstra(graph, start, end)
+    if end not in distances:
+        return math.inf, []
+    return distances[end], reconstruct_path(previous, end)
+
+
+def bidirectional_dijkstra(graph, start, end):
+    if start == end:
+        return 0, [start]
+    neighbours = graph.neighbours
+    push, pop = heapq.heappush, heapq.heappop
+    distances = ({start : 0}, {end : 0})
+    previous = ({start : None}, {end : None})
+    settled = (set(), set())
+    heaps = ([(0, start)], [(0, end)])
+    best = math.inf
+    meeting = None
+
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1 #expand the cheaper frontier
+        dst, node = pop(heaps[side])
+        if node in settled[side]:
+            continue
+        settled[side].add(node)
+        ownDistances, otherDistances = distances[side], distances[1 - side]
+        for neighbour, weight in neighbours(node):
+            newDst = dst + weight
+            if newDst < ownDistances.get(neighbour, math.inf):
+                ownDistances[neighbour] = newDst
+                previous[side][neighbour] = node
+                push(heaps[side], (newDst, neighbour))
+            if neighbour in otherDistances and newDst + otherDistances[neighbour] < best:
+                best = newDst + otherDistances[neighbour]
+                meeting = neighbour
+
+    if meeting is None:
+        return math.inf, []
+    path = reconstruct_path(previous[0], meeting)
+    node = previous[1][meeting]
+    while node is not None:
+        path.append(node)
+        node = previous[1][node]
+    return best, path
+
+
+def csr_dijkstra(offsets, targets, weights, start, end=-1):
+    # Index-based variant for CSR snapshots: flat lists instead of dicts and
+    # sets, returns (distances, previous) indexed by node index.
+    count = len(offsets) - 1
+    distances = [math.inf] * count
+    previous = [-1] * count
+    settled = bytearray(count)
+    distances[start] = 0
+    heap = [(0, start)]
+    push, pop = heapq.heappush, heapq.heappop
+
+    while heap:
+        dst, node = pop(heap)
+        if settled[node]:
+            continue
+        settled[node] = 1
+        if node == end:
+            break
+        for k in range(offsets[node], offsets[node + 1]):
+            neighbour = targets[k]
+            newDst = dst + weights[k]
+            if newDst < distances[neighbour]:
+                distances[neighbour] = newDst
+                previous[neighbour] = node
+                push(heap, (newDst, neighbour))
+    return distances, previous
+
+
+# Many-source shortest paths. Each worker process receives the CSR arrays once
+# through the pool initializer (inherited copy-on-write under fork) and then
+# only source indices go in and distance rows come out.
+
+workerSnapshot = None
+
+
+def init_worker(source):
+    #source is a snapshot path to map again or the (offsets, targets, weights) arrays
+    global workerSnapshot
+    if isinstance(source, str):
+        source = graph_io.map_snapshot(source)[2:5]
+    workerSnapshot = source
+
+
+def worker_rows(sources):
+    return distance_rows(workerSnapshot, sources)
+
+
+def distance_rows(arrays, sources):
+    offsets, targets, weights = arrays
+    return [array.array('d', csr_dijkstra(offsets, targets, weights, source)[0]) for source in sources]
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def worker_source(snapshot):
+    #memoryviews cannot be pickled for spawn or forkserver workers: mapped snapshots send their path instead
+    if snapshot.path is not None:
+        return snapshot.path
+    return tuple(array.array(code, values) if not isinstance(values, array.array) else values
+                 for code, values in zip('qqd', (snapshot.offsets, snapshot.targets, snapshot.weights)))
+
+
+def iter_distances(graph, sources=None, processes=None, chunkSize=8, context=None):
+    # Yields (source, row) in source order; row[i] is the distance to
+    # snapshot.ids[i], where snapshot = graph.freeze(). context is the
+    # multiprocessing context for the worker pool, the platform default if None.
+    snapshot = graph.freeze()
+    if sources is None:
+        sources = snapshot.ids
+    sources = list(sources)
+    indices = [snapshot.index[source] for source in sources]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, max(1, len(indices) // chunkSize))
+    arrays = (snapshot.offsets, snapshot.targets, snapshot.weights)
+    if processes <= 1: #the arrays stay local: the worker global would be shared by every generator in this process
+        rows = (row for chunk in chunked(indices, chunkSize) for row in distance_rows(arrays, chunk))
+        yield from zip(sources, rows)
+        return
+    with concurrent.futures.ProcessPoolExecutor(processes, mp_context=context, initializer=init_worker,
+                                                initargs=(worker_source(snapshot),)) as pool:
+        rows = (row for chunk in pool.map(worker_rows, chunked(indices, chunkSize)) for row in chunk)
+        yield from zip(sources, rows)
+
+
+def distance_matrix(graph, sources=None, processes=None, context=None):
+    # Dense matrix (len(sources) x node count, inf where unreachable) and the
+    # node ids labelling its columns.
+    if numpy is None:
+        raise ImportError('numpy is required for distance_matrix')
+    snapshot = graph.freeze()
+    if sources is None:
+        sources = snapshot.ids
+    sources = list(sources)
+    matrix = numpy.empty((len(sources), snapshot.node_count()))
+    for i, (_, row) in enumerate(iter_distances(snapshot, sources, processes, context=context)):
+        matrix[i] = numpy.frombuffer(row, dtype=numpy.float64)
+    return matrix, list(snapshot.ids)
+
+
+class Dynamic_Shortest_Paths:
+
+    # Single-source distance and predecessor trees kept up to date as the
+    # graph changes. Registered as a graph listener, it repairs only the part
+    # of the tree an edit can affect instead of rerunning Dijkstra:
+    #   cheaper or new edge -> propagate the improvement outwards from it
+    #   dearer or removed tree edge -> re-seed just the subtree below it
+
+    def __init__(self, graph, source):
+        self.graph = graph
+        self.source = source
+        self.distances, self.previous = dijkstra(graph, source)
+        self.children = {}
+        for node, parent in self.previous.items():
+            if parent is not None:
+                self.children.setdefault(parent, set()).add(node)
+        graph.add_listener(self.on_change)
+
+    def close(self):
+        self.graph.remove_listener(self.on_change)
+
+    def path_to(self, node):
+        return reconstruct_path(self.previous, node)
+
+    def set_parent(self, node, parent):
+        oldParent = self.previous.get(node)
+        if oldParent is not None:
+            self.children[oldParent].discard(node)
+        self.previous[node] = parent
+        if parent is not None:
+            self.children.setdefault(parent, set()).add(node)
+
+    def on_change(self, event, *args):
+        if event in ('add_edge', 'edit_edge', 'remove_edge'):
+            node1, node2 = args[0], args[1]
+            weight = self.graph.get_weight(node1, node2) if self.graph.has_node(node1) and self.graph.has_node(node2) else None
+            for parent, child in ((node1, node2), (node2, node1)):
+                if self.previous.get(child) == parent and child != self.source:
+                    if weight is None or self.distances[parent] + weight > self.distances[child]:
+                        self.reseed(self.subtree(child))
+            if weight is not None:
+                self.improve(node1, node2, weight)
+                self.improve(node2, node1, weight)
+        elif event == 'remove_edges':
+            #removals only lengthen paths: everything below a lost tree edge is re-seeded in one pass
+            roots = set()
+            for node1, node2 in args[0]:
+                for parent, child in ((node1, node2), (node2, node1)):
+                    if self.previous.get(child) == parent and child != self.source:
+                        roots.add(child)
+            self.reseed(self.subtrees(roots))
+        elif event == 'remove_node':
+            self.remove_nodes([args[0]])
+        elif event == 'remove_nodes':
+            self.remove_nodes(args[0])
+
+    def remove_nodes(self, nodes):
+        nodes = {node for node in nodes if node in self.distances}
+        if len(nodes) == 0:
+            return
+        if self.source in nodes:
+            self.distances, self.previous, self.children = {}, {}, {}
+            return
+        affected = self.subtrees(nodes) - nodes
+        for node in nodes:
+            self.set_parent(node, None)
+        for node in nodes:
+            for child in self.children.pop(node, ()):
+                self.previous[child] = None
+        for node in nodes:
+            del self.distances[node]
+            del self.previous[node]
+        self.reseed(affected)
+
+    def subtrees(self, roots):
+        found = set()
+        for root in roots:
+            if root not in found:
+                found |= self.subtree(root)
+        return found
+
+    def subtree(self, root):
+        found = {root}
+        stack = [root]
+        while stack:
+            for child in self.children.get(stack.pop(), ()):
+                if child not in found:
+                    found.add(child)
+                    stack.append(child)
+        return found
+
+    def improve(self, node, neighbour, weight):
+        if node not in self.distances:
+            return
+        newDst = self.distances[node] + weight
+        if newDst >= self.distances.get(neighbour, math.inf):
+            return
+        self.distances[neighbour] = newDst
+        self.set_parent(neighbour, node)
+        self.propagate([(newDst, neighbour)])
+
+    def propagate(self, heap):
+        #Dijkstra from the given seeds, only following edges that improve a distance
+        heapq.heapify(heap)
+        distances = self.distances
+        while heap:
+            dst, node = heapq.heappop(heap)
+            if dst > distances.get(node, math.inf):
+                continue
+            for neighbour, weight in self.graph.neighbours(node):
+                newDst = dst + weight
+                if newDst < distances.get(neighbour, math.inf):
+                    distances[neighbour] = newDst
+                    self.set_parent(neighbour, node)
+                    heapq.heappush(heap, (newDst, neighbour))
+
+    def reseed(self, nodes):
+        #forget the distances in nodes, then rebuild them from their best neighbour outside the set
+        for node in nodes:
+            self.distances.pop(node, None)
+        heap = []
+        for node in nodes:
+            best, bestParent = math.inf, None
+            for neighbour, weight in self.graph.neighbours(node):
+                if neighbour not in nodes and neighbour in self.distances and self.distances[neighbour] + weight < best:
+                    best, bestParent = self.distances[neighbour] + weight, neighbour
+            if bestParent is None:
+                self.set_parent(node, None)
+                self.previous.pop(node, None)
+            else:
+                self.distances[node] = best
+                self.set_parent(node, bestParent)
+                heap.append((best, node))
+        self.propagate(heap)
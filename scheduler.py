@@ -0,0 +1,43 @@
+import time
+
+class Step_Scheduler:
+
+    # Advances generator-based tasks from the frame loop, stopping once the
+    # frame's time budget is used up so long tasks never stall input or drawing
+
+    def __init__(self):
+        self.tasks = []
+
+    def add(self, steps, onStep, onDone=None, checkEvery=16):
+        #checkEvery: steps between clock reads, 1 for steps that are expensive on their own
+        task = [steps, onStep, onDone, checkEvery]
+        self.tasks.append(task)
+        return steps
+
+    def cancel(self, steps):
+        self.tasks = [task for task in self.tasks if task[0] is not steps]
+        steps.close()
+
+    def is_running(self, steps):
+        return any(task[0] is steps for task in self.tasks)
+
+    def is_busy(self):
+        return len(self.tasks) > 0
+
+    def advance(self, budget):
+        deadline = time.perf_counter() + budget
+        while self.tasks and time.perf_counter() < deadline:
+            for task in list(self.tasks):
+                self.run(task)
+
+    def run(self, task):
+        steps, onStep, onDone, checkEvery = task
+        for _ in range(checkEvery):
+            try:
+                event = next(steps)
+            except StopIteration as stop:
+                self.tasks.remove(task)
+                if onDone is not None:
+                    onDone(stop.value)
+                return
+            onStep(event)
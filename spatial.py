@@ -0,0 +1,75 @@
+import math
+
+class Spatial_Grid:
+
+    # Uniform grid over item bounding rects (x, y, width, height). Each item is
+    # registered in every cell its rect touches, so queries only look at the
+    # items in the cells they overlap.
+
+    def __init__(self, cellSize=100):
+        self.cellSize = cellSize
+        self.cells = {}
+        self.items = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.items
+
+    def cell_range(self, rect):
+        size = self.cellSize
+        return (math.floor(rect[0] / size), math.floor(rect[1] / size),
+                math.floor((rect[0] + rect[2]) / size), math.floor((rect[1] + rect[3]) / size))
+
+    def insert(self, item, rect):
+        cellRange = self.cell_range(rect)
+        self.items[item] = cellRange
+        x0, y0, x1, y1 = cellRange
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    self.cells[(cx, cy)] = cell = set()
+                cell.add(item)
+
+    def remove(self, item):
+        cellRange = self.items.pop(item, None)
+        if cellRange is None:
+            return
+        x0, y0, x1, y1 = cellRange
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells[(cx, cy)]
+                cell.discard(item)
+                if len(cell) == 0:
+                    del self.cells[(cx, cy)]
+
+    def update(self, item, rect):
+        if self.items.get(item) == self.cell_range(rect): #still covers the same cells
+            return
+        self.remove(item)
+        self.insert(item, rect)
+
+    def query_point(self, pos):
+        size = self.cellSize
+        return self.cells.get((math.floor(pos[0] / size), math.floor(pos[1] / size)), ())
+
+    def query_rect(self, rect):
+        x0, y0, x1, y1 = self.cell_range(rect)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells): #cheaper to walk the occupied cells
+            found = set()
+            for (cx, cy), cell in self.cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    found.update(cell)
+            return found
+        found = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    found.update(cell)
+        return found
+
+    def query_radius(self, pos, radius):
+        return self.query_rect((pos[0] - radius, pos[1] - radius, 2 * radius, 2 * radius))
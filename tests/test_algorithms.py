@@ -0,0 +1,83 @@
+import os, random, sys, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import algorithms, graph
+
+
+class Union_Find_Test(unittest.TestCase):
+
+    def test_against_labels(self):
+        #every union is checked against relabelling one whole set
+        rng = random.Random(0)
+        count = 200
+        sets = algorithms.Union_Find(count)
+        labels = list(range(count))
+        for _ in range(300):
+            i, j = rng.randrange(count), rng.randrange(count)
+            joined = labels[i] != labels[j]
+            self.assertEqual(sets.union(i, j), joined)
+            if joined:
+                old = labels[j]
+                labels = [labels[i] if label == old else label for label in labels]
+            self.assertEqual(sets.sets, len(set(labels)))
+        for i in range(count):
+            for j in range(0, count, 7):
+                self.assertEqual(sets.find(i) == sets.find(j), labels[i] == labels[j])
+
+    def test_components_and_spanning_trees(self):
+        rng = random.Random(1)
+        g = graph.Graph()
+        for id in range(40):
+            g.add_node(id)
+        for _ in range(35):
+            node1, node2 = rng.sample(range(40), 2)
+            g.add_edge(node1, node2, rng.randint(1, 20))
+        components = algorithms.components(g)
+        self.assertEqual(sorted(id for component in components for id in component), list(range(40)))
+        self.assertEqual([len(component) for component in components], sorted(map(len, components), reverse=True))
+        for component in components:
+            reached = g.bfs(component[0])[0]
+            self.assertEqual(set(reached), set(component))
+        kruskalTotal, kruskalTree = algorithms.kruskal(g)
+        primTotal, primTree = algorithms.prim(g)
+        self.assertEqual(kruskalTotal, primTotal)
+        self.assertEqual(len(kruskalTree), 40 - len(components))
+        self.assertEqual(len(primTree), 40 - len(components))
+
+
+class Fenwick_Tree_Test(unittest.TestCase):
+
+    def test_against_list(self):
+        rng = random.Random(2)
+        tree = algorithms.Fenwick_Tree()
+        values = []
+        for _ in range(500):
+            if len(values) == 0 or rng.random() < 0.4:
+                value = rng.randint(0, 3)
+                self.assertEqual(tree.append(value), len(values))
+                values.append(value)
+            else:
+                position = rng.randrange(len(values))
+                delta = rng.randint(-values[position], 3)
+                tree.add(position, delta)
+                values[position] += delta
+            self.assertEqual(len(tree), len(values))
+            count = rng.randint(0, len(values))
+            self.assertEqual(tree.prefix(count), sum(values[:count]))
+        for count in range(len(values) + 1):
+            self.assertEqual(tree.prefix(count), sum(values[:count]))
+
+    def test_ranks(self):
+        #a 1 per live item: prefix(position) is the number of live items before it
+        tree = algorithms.Fenwick_Tree()
+        for _ in range(10):
+            tree.append(1)
+        for position in (0, 4, 5, 9):
+            tree.add(position, -1)
+        live = [position for position in range(10) if position not in (0, 4, 5, 9)]
+        self.assertEqual([tree.prefix(position) for position in live], list(range(len(live))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph, graph_io
+
+
+def star_graph(g):
+    #0 in the middle, joined to 1..5, with a ring 1-2-3-4-5 and a self loop on 3
+    for id in range(6):
+        g.add_node(id)
+    for id in range(1, 6):
+        g.add_edge(0, id, id)
+        g.add_edge(id, id % 5 + 1, 10 + id)
+    g.add_edge(3, 3, 7)
+    return g
+
+
+class Removal_Test(unittest.TestCase):
+
+    # Runs on the dict graph and on a Mapped_Graph opened from a snapshot
+    # of the same graph, which must agree edit for edit.
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, 'star.gsnap')
+        graph_io.write(star_graph(graph.Graph()), path)
+        self.graphs = [star_graph(graph.Graph()), graph.Mapped_Graph.open(path)]
+        self.events = []
+        for g in self.graphs:
+            g.add_listener(lambda event, *args: self.events.append(event))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertSymmetric(self, g):
+        for id in g.node_ids():
+            for neighbour, weight in g.neighbours(id):
+                self.assertTrue(g.has_node(neighbour))
+                self.assertEqual(g.get_weight(neighbour, id), weight)
+
+    def test_remove_node(self):
+        for g in self.graphs:
+            g.remove_node(3)
+            self.assertFalse(g.has_node(3))
+            self.assertEqual(g.node_count(), 5)
+            self.assertEqual(sorted(neighbour for neighbour, _ in g.neighbours(0)), [1, 2, 4, 5])
+            self.assertSymmetric(g)
+        self.assertEqual(self.graphs[0].as_dict(), self.graphs[1].as_dict())
+
+    def test_remove_nodes(self):
+        for g in self.graphs:
+            versions = g.version
+            g.remove_nodes([0, 2])
+            self.assertEqual(g.version, versions + 1)
+            self.assertEqual(set(g.node_ids()), {1, 3, 4, 5})
+            self.assertFalse(g.has_edge(1, 2))
+            self.assertSymmetric(g)
+        self.assertEqual(self.events, ['remove_nodes', 'remove_nodes'])
+        self.assertEqual(self.graphs[0].as_dict(), self.graphs[1].as_dict())
+
+    def test_remove_edges(self):
+        for g in self.graphs:
+            g.remove_edge(0, 1)
+            g.remove_edges([(1, 2), (3, 3), (4, 3)])
+            self.assertFalse(g.has_edge(1, 0))
+            self.assertFalse(g.has_edge(2, 1))
+            self.assertFalse(g.has_edge(3, 3))
+            self.assertFalse(g.has_edge(3, 4))
+            self.assertEqual(g.node_count(), 6)
+            self.assertSymmetric(g)
+        self.assertEqual(self.events, ['remove_edge', 'remove_edges'] * 2)
+        self.assertEqual(self.graphs[0].as_dict(), self.graphs[1].as_dict())
+
+    def test_remove_then_add(self):
+        for g in self.graphs:
+            g.remove_node(0)
+            g.add_node(0)
+            self.assertEqual(list(g.neighbours(0)), [])
+            g.add_edge(0, 5, 2)
+            self.assertEqual(g.get_weight(5, 0), 2)
+            self.assertSymmetric(g)
+        self.assertEqual(self.graphs[0].as_dict(), self.graphs[1].as_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import io, json, os, random, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph, graph_io
+
+
+document = '''{"version": 12345,
+  "name" : "a \\"quoted\\" name, with [brackets] and {braces}",
+  "nodes": [ {"id": 1, "x": 10.5, "y": -2e3},{"id":22},
+     {"id": 333, "x": 0.125, "y": 7, "label": "\\u00e9t\\u00e9 \\\\ ]"} ] ,
+  "empty": [],
+  "edges":[[1,22,1000000],[22, 333, 0.5] , [1, 333]]
+}'''
+
+
+def expected_items(text):
+    return [(key, item) for key, value in json.loads(text).items() if isinstance(value, list) for item in value]
+
+
+class Json_Arrays_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.chunkSize = graph_io.chunkSize
+
+    def tearDown(self):
+        graph_io.chunkSize = self.chunkSize
+
+    def items(self, text, chunkSize):
+        graph_io.chunkSize = chunkSize
+        return list(graph_io.iter_json_arrays(io.StringIO(text)))
+
+    def test_chunk_boundaries(self):
+        #every chunk size up to the whole document puts a boundary inside every token at least once
+        expected = expected_items(document)
+        for chunkSize in range(1, len(document) + 1):
+            self.assertEqual(self.items(document, chunkSize), expected, f'chunk size {chunkSize}')
+
+    def test_empty_object(self):
+        for chunkSize in (1, 2, 64):
+            self.assertEqual(self.items(' { } ', chunkSize), [])
+
+    def test_truncated(self):
+        for chunkSize in (1, 3, 64):
+            with self.assertRaises(ValueError):
+                self.items(document[:document.index('[22')], chunkSize)
+            with self.assertRaises(ValueError):
+                self.items('[1, 2]', chunkSize)
+
+
+class Formats_Test(unittest.TestCase):
+
+    def test_round_trip(self):
+        rng = random.Random(0)
+        g = graph.Graph()
+        for id in range(30):
+            g.add_node(id)
+        g.add_node(99) #no edges
+        for _ in range(60):
+            node1, node2 = rng.sample(range(30), 2)
+            g.add_edge(node1, node2, rng.choice((rng.randint(0, 99), rng.random())))
+        positions = {id : (float(id), id / 4) for id in range(0, 30, 2)}
+        with tempfile.TemporaryDirectory() as directory:
+            for extension in graph_io.writers:
+                path = os.path.join(directory, 'g' + extension)
+                graph_io.write(g, path, positions)
+                records = list(graph_io.read(path))
+                loaded = graph_io.load(graph.Graph(), records)
+                if extension == '.csv': #an edge list only has the nodes with edges
+                    g.remove_node(99)
+                    self.assertEqual(loaded.as_dict(), g.as_dict())
+                    g.add_node(99)
+                    continue
+                self.assertEqual(loaded.as_dict(), g.as_dict(), extension)
+                self.assertEqual({record[1] : record[2] for record in records if record[0] == 'node' and record[2] is not None},
+                                 positions, extension)
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            graph_io.read('graph.txt')
+        with self.assertRaises(ValueError):
+            graph_io.write(graph.Graph(), 'graph.txt')
+
+
+if __name__ == '__main__':
+    unittest.main()
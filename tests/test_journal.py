@@ -0,0 +1,198 @@
+import json, os, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph, graph_io, journal
+
+
+def apply(g, positions, op):
+    #what the editor does with an operation, without the widgets
+    kind = op[0]
+    if kind == 'add_node':
+        _, id, x, y, edges = op
+        g.add_node(id)
+        positions[id] = (x, y)
+        for other, weight in edges:
+            g.add_edge(id, other, weight)
+    elif kind == 'remove_node':
+        g.remove_node(op[1])
+        del positions[op[1]]
+    elif kind == 'add_edge':
+        g.add_edge(op[1], op[2], op[3])
+    elif kind == 'remove_edge':
+        g.remove_edge(op[1], op[2])
+    elif kind == 'edit_edge':
+        g.edit_edge(op[1], op[2], op[4])
+    elif kind == 'move_nodes':
+        for id, oldX, oldY, x, y in op[1]:
+            positions[id] = (x, y)
+
+
+class Session:
+
+    # A graph, its node positions and a journal, standing in for the editor.
+
+    def __init__(self, path, snapshotEvery=500):
+        self.graph = graph.Graph()
+        self.positions = {}
+        self.journal = journal.Journal(path)
+        self.journal.snapshotEvery = snapshotEvery
+        self.journal.snapshotWriter = lambda path: graph_io.write(self.graph, path, self.positions)
+
+    def do(self, op):
+        self.journal.record(op)
+        apply(self.graph, self.positions, op)
+        self.journal.checkpoint()
+
+    def undo(self):
+        op = self.journal.undo()
+        apply(self.graph, self.positions, op)
+        self.journal.checkpoint()
+
+    def redo(self):
+        op = self.journal.redo()
+        apply(self.graph, self.positions, op)
+        self.journal.checkpoint()
+
+    def crash(self):
+        #stops without a clean exit, leaving the journal files behind. Every line is flushed as it is
+        #logged, so recovering from a session that is still open sees the same files
+        self.journal.file.close()
+
+
+def recover(path):
+    #a new session rebuilt from the files a crashed one left
+    session = Session(path)
+    snapshot, entries = session.journal.recovery()
+    if snapshot is not None:
+        for record in graph_io.read(snapshot):
+            if record[0] == 'node':
+                session.graph.add_node(record[1])
+                session.positions[record[1]] = record[2]
+            else:
+                session.graph.add_edge(record[1], record[2], record[3])
+    for kind, op in entries:
+        apply(session.graph, session.positions, session.journal.replay(kind, op))
+    return session
+
+
+def build(session, count):
+    for id in range(count):
+        edges = ((id - 1, id),) if id > 0 else ()
+        session.do(('add_node', id, 10.0 * id, 20.0, edges))
+
+
+class Journal_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'g.journal')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assertSameSession(self, recovered, session):
+        self.assertEqual(recovered.graph.as_dict(), session.graph.as_dict())
+        self.assertEqual(recovered.positions, session.positions)
+        self.assertEqual(recovered.journal.undoStack, session.journal.undoStack)
+        self.assertEqual(recovered.journal.redoStack, session.journal.redoStack)
+
+    def test_inverse(self):
+        ops = [('add_node', 1, 0.0, 0.0, ((2, 5),)), ('add_edge', 1, 2, 5), ('edit_edge', 1, 2, 5, 7),
+               ('move_nodes', ((1, 0.0, 0.0, 3.0, 4.0),))]
+        for op in ops:
+            self.assertEqual(journal.inverse(journal.inverse(op)), op)
+        self.assertEqual(journal.inverse(ops[2]), ('edit_edge', 1, 2, 7, 5))
+
+    def test_undo_redo(self):
+        session = Session(None)
+        build(session, 3)
+        session.do(('edit_edge', 1, 2, 2, 9))
+        session.undo()
+        self.assertEqual(session.graph.get_weight(1, 2), 2)
+        session.redo()
+        self.assertEqual(session.graph.get_weight(1, 2), 9)
+        session.undo()
+        session.do(('add_edge', 0, 2, 4))
+        self.assertFalse(session.journal.can_redo())
+        self.assertIsNone(session.journal.redo())
+
+    def test_recover_log_only(self):
+        session = Session(self.path)
+        build(session, 5)
+        session.do(('move_nodes', ((2, 20.0, 20.0, 25.0, 30.0),)))
+        session.undo()
+        session.undo()
+        session.redo()
+        session.crash()
+        self.assertSameSession(recover(self.path), session)
+
+    def test_recover_from_snapshot(self):
+        session = Session(self.path, snapshotEvery=4)
+        build(session, 10)
+        session.do(('edit_edge', 3, 4, 4, 40))
+        session.do(('remove_node', 6, 60.0, 20.0, ((5, 6), (7, 7))))
+        session.crash()
+        self.assertEqual(len(session.journal.snapshots()), 1)
+        with open(self.path) as file:
+            self.assertLess(len(file.readlines()), 4)
+        recovered = recover(self.path)
+        self.assertEqual(recovered.graph.as_dict(), session.graph.as_dict())
+        self.assertEqual(recovered.positions, session.positions)
+
+    def test_undo_past_snapshot(self):
+        session = Session(self.path, snapshotEvery=3)
+        build(session, 4)
+        session.undo()
+        session.undo()
+        session.crash()
+        recovered = recover(self.path)
+        self.assertEqual(recovered.graph.as_dict(), session.graph.as_dict())
+
+    def test_recover_cut_off_line(self):
+        session = Session(self.path)
+        build(session, 3)
+        session.crash()
+        with open(self.path, 'a') as file:
+            file.write(json.dumps([0, 'do', ('add_node', 3, 0.0, 0.0, ())])[:-7])
+        self.assertSameSession(recover(self.path), session)
+
+    def test_crash_during_background_snapshot(self):
+        #lines logged while the snapshot is written build on it, but replay from the previous one until it is complete
+        session = Session(self.path, snapshotEvery=3)
+        build(session, 3)
+        generation, temporary = session.journal.start_snapshot()
+        graph_io.write(session.graph, temporary, session.positions)
+        session.do(('edit_edge', 0, 1, 1, 11))
+        self.assertEqual(recover(self.path).graph.as_dict(), session.graph.as_dict())
+        session.journal.finish_snapshot(generation)
+        session.do(('edit_edge', 1, 2, 2, 12))
+        session.crash()
+        self.assertEqual(list(session.journal.snapshots()), [generation])
+        self.assertEqual(recover(self.path).graph.as_dict(), session.graph.as_dict())
+
+    def test_abandoned_snapshot(self):
+        #the lines keep replaying from the previous snapshot, and the next checkpoint writes a new one
+        session = Session(self.path)
+        build(session, 3)
+        generation, temporary = session.journal.start_snapshot()
+        session.do(('edit_edge', 0, 1, 1, 11))
+        session.journal.abandon_snapshot(generation)
+        self.assertFalse(os.path.exists(temporary))
+        self.assertSameSession(recover(self.path), session)
+        session.do(('edit_edge', 1, 2, 2, 12))
+        session.crash()
+        self.assertEqual(list(session.journal.snapshots()), [generation + 1])
+        self.assertEqual(recover(self.path).graph.as_dict(), session.graph.as_dict())
+
+    def test_discard(self):
+        session = Session(self.path, snapshotEvery=2)
+        build(session, 5)
+        self.assertTrue(session.journal.has_recovery())
+        session.journal.discard()
+        self.assertFalse(session.journal.has_recovery())
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import multiprocessing, os, random, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph, graph_io, pathfinding
+
+
+def random_graph(count=60, edges=150, seed=0):
+    rng = random.Random(seed)
+    g = graph.Graph()
+    for id in range(count):
+        g.add_node(id)
+    for _ in range(edges):
+        node1, node2 = rng.sample(range(count), 2)
+        g.add_edge(node1, node2, rng.randint(1, 99))
+    return g
+
+
+class Iter_Distances_Test(unittest.TestCase):
+
+    def expected(self, g):
+        return {source : [g.dijkstra(source)[0].get(id, float('inf')) for id in g.freeze().ids] for source in g.node_ids()}
+
+    def rows(self, g, **options):
+        return {source : list(row) for source, row in pathfinding.iter_distances(g, **options)}
+
+    def test_inline(self):
+        g = random_graph()
+        self.assertEqual(self.rows(g, processes=1), self.expected(g))
+
+    def test_spawn_pool(self):
+        g = random_graph()
+        context = multiprocessing.get_context('spawn')
+        self.assertEqual(self.rows(g, processes=2, context=context), self.expected(g))
+
+    def test_spawn_pool_mapped_snapshot(self):
+        g = random_graph()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'g.gsnap')
+            graph_io.write(g, path)
+            mapped = graph.CSR_Graph.open(path)
+            context = multiprocessing.get_context('spawn')
+            rows = self.rows(mapped, processes=2, context=context)
+            del mapped
+        self.assertEqual(rows, self.expected(g))
+
+
+class Dynamic_Shortest_Paths_Test(unittest.TestCase):
+
+    def assertMatchesDijkstra(self, tracker, g):
+        distances = pathfinding.dijkstra(g, tracker.source)[0] if g.has_node(tracker.source) else {}
+        self.assertEqual(tracker.distances, distances)
+        self.assertEqual(set(tracker.previous), set(distances))
+        for node, parent in tracker.previous.items():
+            if node == tracker.source:
+                self.assertIsNone(parent)
+            else:
+                self.assertEqual(distances[node], distances[parent] + g.get_weight(parent, node))
+                self.assertIn(node, tracker.children[parent])
+        for parent, children in tracker.children.items():
+            for child in children:
+                self.assertEqual(tracker.previous[child], parent)
+
+    def edit(self, g, rng, nextId, source):
+        #one random mutation through every kind of graph event, never removing the source
+        ids = list(g.node_ids())
+        others = [id for id in ids if id != source]
+        edges = [(node1, node2) for node1, node2, _ in graph_io.iter_edges(g)]
+        choice = rng.random()
+        if choice < 0.3 or len(edges) < 4:
+            node1, node2 = rng.sample(ids, 2)
+            g.add_edge(node1, node2, rng.randint(1, 30))
+        elif choice < 0.6:
+            node1, node2 = rng.choice(edges)
+            g.edit_edge(node1, node2, max(1, g.get_weight(node1, node2) + rng.randint(-15, 15)))
+        elif choice < 0.75:
+            g.remove_edge(*rng.choice(edges))
+        elif choice < 0.85:
+            g.remove_edges(rng.sample(edges, 3))
+        elif choice < 0.9:
+            g.add_node(nextId)
+            g.add_edge(nextId, rng.choice(ids), rng.randint(1, 30))
+        elif choice < 0.95:
+            g.remove_node(rng.choice(others))
+        else:
+            g.remove_nodes(rng.sample(others, 2))
+
+    def test_against_dijkstra(self):
+        for seed in range(4):
+            rng = random.Random(seed)
+            g = random_graph(40, 80, seed)
+            source = 0
+            tracker = g.track_paths(source)
+            nextId = 1000
+            for _ in range(300):
+                self.edit(g, rng, nextId, source)
+                nextId += 1
+                self.assertMatchesDijkstra(tracker, g)
+            tracker.close()
+            self.assertNotIn(tracker.on_change, g.listeners)
+
+    def test_path_to(self):
+        g = graph.Graph()
+        for id in range(4):
+            g.add_node(id)
+        g.add_edge(0, 1, 1)
+        g.add_edge(1, 2, 1)
+        g.add_edge(0, 2, 5)
+        tracker = g.track_paths(0)
+        self.assertEqual(tracker.path_to(2), [0, 1, 2])
+        g.edit_edge(1, 2, 10)
+        self.assertEqual(tracker.path_to(2), [0, 2])
+        self.assertEqual(tracker.distances[2], 5)
+        g.add_edge(2, 3, 1)
+        self.assertEqual(tracker.path_to(3), [0, 2, 3])
+        g.remove_node(0)
+        self.assertEqual(tracker.distances, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os, random, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import graph, graph_io
+
+
+def random_graph(ids, edges=120, seed=0, weight=None):
+    rng = random.Random(seed)
+    g = graph.Graph()
+    for id in ids:
+        g.add_node(id)
+    for _ in range(edges):
+        node1, node2 = rng.sample(ids, 2)
+        g.add_edge(node1, node2, weight(rng) if weight else rng.randint(1, 99))
+    return g
+
+
+class Snapshot_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'g.gsnap')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read(self, path):
+        return graph_io.load(graph.Graph(), graph_io.read(path))
+
+    def test_round_trip(self):
+        for ids in (list(range(5, 45)), [3, 17, 2, 90, 41, 8, 1000]):
+            g = random_graph(ids, edges=3 * len(ids))
+            graph_io.write(g, self.path)
+            self.assertEqual(self.read(self.path).as_dict(), g.as_dict())
+
+    def test_round_trip_weights(self):
+        g = random_graph(list(range(30)), weight=lambda rng: rng.random())
+        graph_io.write(g, self.path)
+        self.assertEqual(self.read(self.path).as_dict(), g.as_dict())
+        mapped = graph.Mapped_Graph.open(self.path)
+        self.assertFalse(mapped.integerWeights)
+        node1, node2, weight = next(graph_io.iter_edges(g))
+        self.assertEqual(mapped.get_weight(node1, node2), weight)
+
+    def test_positions(self):
+        g = random_graph(list(range(10)))
+        positions = {id : (id * 1.5, -id) for id in range(10) if id != 4}
+        graph_io.write(g, self.path, positions)
+        mapped = graph.Mapped_Graph.open(self.path)
+        self.assertIsNone(mapped.position(4))
+        self.assertEqual(mapped.position(7), (10.5, -7.0))
+        records = list(mapped.base_records())
+        self.assertEqual([record[1] for record in records], list(range(10)))
+
+    def test_mapped_matches(self):
+        g = random_graph(list(range(50)))
+        graph_io.write(g, self.path)
+        mapped = graph.Mapped_Graph.open(self.path)
+        self.assertFalse(mapped.is_edited())
+        self.assertEqual(mapped.as_dict(), g.as_dict())
+        self.assertEqual(mapped.node_count(), 50)
+        self.assertEqual(len(mapped.node_ids()), 50)
+        self.assertEqual(mapped.max_id(), 49)
+        self.assertIsInstance(mapped.get_weight(*next(graph_io.iter_edges(g))[:2]), int)
+        self.assertEqual(mapped.dijkstra(0)[0], g.dijkstra(0)[0])
+
+    def test_mapped_edits(self):
+        g = random_graph(list(range(40)))
+        graph_io.write(g, self.path)
+        mapped = graph.Mapped_Graph.open(self.path)
+        rng = random.Random(1)
+        for step in range(200):
+            ids = list(g.node_ids())
+            choice = rng.random()
+            if choice < 0.1:
+                id = 100 + step
+                for target in (g, mapped):
+                    target.add_node(id)
+            elif choice < 0.2 and len(ids) > 5:
+                id = rng.choice(ids)
+                for target in (g, mapped):
+                    target.remove_node(id)
+            elif choice < 0.6:
+                node1, node2 = rng.sample(ids, 2)
+                weight = rng.randint(1, 99)
+                for target in (g, mapped):
+                    target.add_edge(node1, node2, weight)
+            else:
+                edges = list(graph_io.iter_edges(g))
+                if len(edges) == 0:
+                    continue
+                node1, node2, _ = rng.choice(edges)
+                for target in (g, mapped):
+                    target.remove_edge(node1, node2)
+        self.assertTrue(mapped.is_edited())
+        self.assertEqual(mapped.as_dict(), g.as_dict())
+        self.assertEqual(mapped.node_count(), g.node_count())
+        self.assertEqual(set(mapped.node_ids()), set(g.node_ids()))
+        for id in g.node_ids():
+            self.assertTrue(mapped.has_node(id))
+            for neighbour, weight in g.neighbours(id):
+                self.assertTrue(mapped.has_edge(id, neighbour))
+                self.assertEqual(mapped.get_weight(id, neighbour), weight)
+        #an edited graph written again maps back to the same graph
+        path = os.path.join(self.directory.name, 'edited.gsnap')
+        graph_io.write(mapped, path)
+        self.assertEqual(graph.Mapped_Graph.open(path).as_dict(), g.as_dict())
+
+    def test_removed_node(self):
+        g = random_graph(list(range(20)))
+        graph_io.write(g, self.path)
+        mapped = graph.Mapped_Graph.open(self.path)
+        mapped.remove_node(3)
+        self.assertFalse(mapped.has_node(3))
+        self.assertNotIn(3, mapped.node_ids())
+        self.assertNotIn(3, [record[1] for record in mapped.base_records()])
+        for id in mapped.node_ids():
+            self.assertFalse(mapped.has_edge(id, 3))
+        with self.assertRaises(KeyError):
+            mapped.neighbours(3)
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'not a graph snapshot at all, just some bytes')
+        with self.assertRaises(ValueError):
+            graph_io.map_snapshot(self.path)
+        g = random_graph(list(range(10)))
+        graph_io.write(g, self.path)
+        with open(self.path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.path) - 8)
+        with self.assertRaises(ValueError):
+            graph_io.map_snapshot(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()